@@ -0,0 +1,325 @@
+import json
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional, Tuple
+
+from cli.llm.client import _content_text, _message_text
+from cli.processors.utils import approximate_token_count
+
+DOCUMENT_MARKER = "Here is the PDF text:\n"
+EXCERPT_MARKER = "Here is the excerpt:\n"
+FIRST_PAGE_MARKER = "Here is the first page:\n"
+STREAM_CHUNK_CHARS = 64
+
+def _after(text: str, marker: str) -> str:
+    index = text.find(marker)
+    return text[index + len(marker):].strip() if index >= 0 else ''
+
+class MockSettings:
+    def __init__(
+        self,
+        latency_ms: float = 200.0,
+        jitter_ms: float = 50.0,
+        ms_per_output_token: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        server_error_rate: float = 0.0,
+        truncate_rate: float = 0.0,
+        retry_after_s: float = 0.5,
+        seed: Optional[int] = None
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.ms_per_output_token = ms_per_output_token
+        self.rate_limit_rate = rate_limit_rate
+        self.server_error_rate = server_error_rate
+        self.truncate_rate = truncate_rate
+        self.retry_after_s = retry_after_s
+        self.random = random.Random(seed)
+
+class MockAnthropicServer:
+    def __init__(self, settings: Optional[MockSettings] = None, host: str = '127.0.0.1', port: int = 0):
+        self.settings = settings or MockSettings()
+        self.stats = {'requests': 0, 'token_counts': 0, 'batches': 0, 'batch_requests': 0,
+                      'rate_limited': 0, 'server_errors': 0, 'truncated': 0}
+        self.batches: Dict[str, Dict[str, Any]] = {}
+        self._batch_results: Dict[str, List[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'MockAnthropicServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, name='mock-anthropic', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'MockAnthropicServer':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _count(self, field: str):
+        with self._lock:
+            self.stats[field] += 1
+
+    def _roll(self, rate: float) -> bool:
+        with self._lock:
+            return rate > 0 and self.settings.random.random() < rate
+
+    def _injected_error(self) -> Optional[Tuple[int, Dict[str, Any], Dict[str, str]]]:
+        if self._roll(self.settings.rate_limit_rate):
+            self._count('rate_limited')
+            return 429, {'type': 'rate_limit_error', 'message': 'Mock rate limit'}, \
+                {'retry-after': str(self.settings.retry_after_s)}
+        if self._roll(self.settings.server_error_rate):
+            self._count('server_errors')
+            return 529, {'type': 'overloaded_error', 'message': 'Mock overload'}, {}
+        return None
+
+    def _delay_ms(self) -> float:
+        settings = self.settings
+        with self._lock:
+            return max(0.0, settings.latency_ms + settings.random.uniform(-1, 1) * settings.jitter_ms)
+
+    def _message(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        input_tokens = approximate_token_count(
+            _content_text(request.get('system')) + _message_text(request.get('messages', []))
+        )
+        content, stop_reason = self._reply(request)
+        output_tokens = sum(approximate_token_count(block.get('text') or json.dumps(block.get('input')))
+                            for block in content)
+        return {
+            'id': f"msg_{uuid.uuid4().hex[:24]}",
+            'type': 'message',
+            'role': 'assistant',
+            'model': request.get('model'),
+            'content': content,
+            'stop_reason': stop_reason,
+            'stop_sequence': None,
+            'usage': {
+                'input_tokens': input_tokens,
+                'output_tokens': output_tokens,
+                'cache_creation_input_tokens': 0,
+                'cache_read_input_tokens': 0
+            }
+        }
+
+    def _create_batch(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        entries = request.get('requests', [])
+        created_at = datetime.now(timezone.utc)
+        batch = {
+            'id': f"msgbatch_{uuid.uuid4().hex[:24]}",
+            'type': 'message_batch',
+            'processing_status': 'in_progress',
+            'request_counts': {'processing': len(entries), 'succeeded': 0, 'errored': 0, 'canceled': 0, 'expired': 0},
+            'created_at': created_at.isoformat(),
+            'expires_at': (created_at + timedelta(hours=24)).isoformat(),
+            'ended_at': None,
+            'archived_at': None,
+            'cancel_initiated_at': None,
+            'results_url': None
+        }
+        with self._lock:
+            self.batches[batch['id']] = batch
+        self._count('batches')
+        threading.Thread(target=self._process_batch, args=(batch['id'], entries),
+                         name='mock-batch', daemon=True).start()
+        return dict(batch)
+
+    def _process_batch(self, batch_id: str, entries: List[Dict[str, Any]]):
+        time.sleep(self._delay_ms() / 1000)
+        results = []
+        for entry in entries:
+            self._count('batch_requests')
+            error = self._injected_error()
+            if error is not None:
+                result = {'type': 'errored', 'error': {'type': 'error', 'error': error[1]}}
+            else:
+                result = {'type': 'succeeded', 'message': self._message(entry.get('params', {}))}
+            results.append({'custom_id': entry.get('custom_id'), 'result': result})
+
+        with self._lock:
+            batch = self.batches[batch_id]
+            batch['request_counts'] = {
+                'processing': 0,
+                'succeeded': sum(1 for entry in results if entry['result']['type'] == 'succeeded'),
+                'errored': sum(1 for entry in results if entry['result']['type'] == 'errored'),
+                'canceled': 0,
+                'expired': 0
+            }
+            batch['processing_status'] = 'ended'
+            batch['ended_at'] = datetime.now(timezone.utc).isoformat()
+            batch['results_url'] = f"{self.base_url}/v1/messages/batches/{batch_id}/results"
+            self._batch_results[batch_id] = results
+
+    def _reply(self, request: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], str]:
+        messages = request.get('messages', [])
+        content = messages[-1].get('content', '') if messages else ''
+        blocks = [content] if isinstance(content, str) else [block.get('text', '') for block in content]
+        prompt = blocks[-1] if blocks else ''
+        source = _after(blocks[0], DOCUMENT_MARKER) if blocks else ''
+        truncate = request.get('max_tokens', 0) > 0 and self._roll(self.settings.truncate_rate)
+        stop_reason = 'max_tokens' if truncate else 'end_turn'
+        if truncate:
+            self._count('truncated')
+
+        if request.get('tools') and 'record_coverage' in prompt:
+            return [{'type': 'tool_use', 'id': f"toolu_{uuid.uuid4().hex[:24]}", 'name': 'record_coverage',
+                     'input': {'score': 95, 'text': 'The Extracted Text covers the source.'}}], 'tool_use'
+        if request.get('tools') and 'record_extraction' in prompt:
+            markdown = source[:len(source) // 2] if truncate else source
+            tool_input = {'title': source.split('\n', 1)[0][:120], 'country': 'Kenya',
+                          'region': 'Africa', 'partner_name': 'Mock Partner', 'llm_markdown': markdown}
+            if 'year and llm_markdown' in prompt:
+                tool_input['year'] = '2024'
+            return [{'type': 'tool_use', 'id': f"toolu_{uuid.uuid4().hex[:24]}", 'name': 'record_extraction',
+                     'input': tool_input}], stop_reason if truncate else 'tool_use'
+        if '<converted_tail>' in prompt:
+            text = source[len(source) // 2:]
+        elif EXCERPT_MARKER in prompt:
+            text = _after(prompt, EXCERPT_MARKER)
+        elif request.get('tools') and FIRST_PAGE_MARKER in prompt:
+            first_page = _after(prompt, FIRST_PAGE_MARKER)
+            metadata = {'title': first_page.split('\n', 1)[0][:120], 'country': 'Kenya',
+                        'region': 'Africa', 'partner_name': 'Mock Partner'}
+            if 'partner_name and year' in prompt:
+                metadata['year'] = '2024'
+            return [{'type': 'tool_use', 'id': f"toolu_{uuid.uuid4().hex[:24]}", 'name': 'record_metadata',
+                     'input': metadata}], 'tool_use'
+        else:
+            text = prompt
+        if truncate:
+            text = text[:len(text) // 2]
+        return [{'type': 'text', 'text': text}], stop_reason
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+                payload = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('content-type', 'application/json')
+                self.send_header('content-length', str(len(payload)))
+                self.send_header('request-id', f"req_{uuid.uuid4().hex[:24]}")
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                parts = self.path.split('?', 1)[0].strip('/').split('/')
+                batch_id = parts[3] if len(parts) in (4, 5) and parts[:3] == ['v1', 'messages', 'batches'] else None
+                with server._lock:
+                    batch = dict(server.batches[batch_id]) if batch_id in server.batches else None
+                    results = server._batch_results.get(batch_id)
+                if batch is None or (len(parts) == 5 and (parts[4] != 'results' or results is None)):
+                    self._send(404, {'type': 'error', 'error': {'type': 'not_found_error', 'message': self.path}})
+                    return
+                if len(parts) == 4:
+                    self._send(200, batch)
+                    return
+
+                payload = ''.join(json.dumps(entry) + '\n' for entry in results).encode('utf-8')
+                self.send_response(200)
+                self.send_header('content-type', 'application/binary')
+                self.send_header('content-length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                length = int(self.headers.get('content-length', 0))
+                request = json.loads(self.rfile.read(length) or b'{}')
+                path = self.path.split('?', 1)[0]
+
+                if path == '/v1/messages/count_tokens':
+                    server._count('token_counts')
+                    self._send(200, {'input_tokens': approximate_token_count(
+                        _content_text(request.get('system')) + _message_text(request.get('messages', []))
+                    )})
+                    return
+                if path == '/v1/messages/batches':
+                    self._send(200, server._create_batch(request))
+                    return
+                if path != '/v1/messages':
+                    self._send(404, {'type': 'error', 'error': {'type': 'not_found_error', 'message': path}})
+                    return
+
+                server._count('requests')
+                settings = server.settings
+                delay_ms = server._delay_ms()
+                error = server._injected_error()
+                if error is not None:
+                    time.sleep(delay_ms / 1000)
+                    status, detail, headers = error
+                    self._send(status, {'type': 'error', 'error': detail}, headers)
+                    return
+
+                message = server._message(request)
+                output_tokens = message['usage']['output_tokens']
+                if request.get('stream'):
+                    time.sleep(delay_ms / 1000)
+                    self._stream(message, settings.ms_per_output_token)
+                    return
+                time.sleep((delay_ms + output_tokens * settings.ms_per_output_token) / 1000)
+                self._send(200, message)
+
+            def _event(self, name: str, data: Dict[str, Any]):
+                self.wfile.write(f"event: {name}\ndata: {json.dumps(data)}\n\n".encode('utf-8'))
+                self.wfile.flush()
+
+            def _stream(self, message: Dict[str, Any], ms_per_output_token: float):
+                self.send_response(200)
+                self.send_header('content-type', 'text/event-stream')
+                self.send_header('connection', 'close')
+                self.end_headers()
+                self.close_connection = True
+
+                usage = message['usage']
+                start = dict(message, content=[], stop_reason=None, usage=dict(usage, output_tokens=1))
+                self._event('message_start', {'type': 'message_start', 'message': start})
+                for index, block in enumerate(message['content']):
+                    if block['type'] == 'tool_use':
+                        text = json.dumps(block['input'])
+                        if message['stop_reason'] == 'max_tokens':
+                            text = text[:len(text) // 2]
+                        opening = dict(block, input={})
+                        delta_type, delta_field = 'input_json_delta', 'partial_json'
+                    else:
+                        text = block['text']
+                        opening = dict(block, text='')
+                        delta_type, delta_field = 'text_delta', 'text'
+                    self._event('content_block_start', {'type': 'content_block_start', 'index': index,
+                                                        'content_block': opening})
+                    for offset in range(0, len(text), STREAM_CHUNK_CHARS):
+                        piece = text[offset:offset + STREAM_CHUNK_CHARS]
+                        self._event('content_block_delta', {'type': 'content_block_delta', 'index': index,
+                                                            'delta': {'type': delta_type, delta_field: piece}})
+                        if ms_per_output_token:
+                            time.sleep(approximate_token_count(piece) * ms_per_output_token / 1000)
+                    self._event('content_block_stop', {'type': 'content_block_stop', 'index': index})
+                self._event('message_delta', {'type': 'message_delta',
+                                              'delta': {'stop_reason': message['stop_reason'], 'stop_sequence': None},
+                                              'usage': {'output_tokens': usage['output_tokens']}})
+                self._event('message_stop', {'type': 'message_stop'})
+
+        return Handler
@@ -0,0 +1,262 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.mock_server import MockAnthropicServer, MockSettings
+from benchmarks.synthetic import WORDS, WRITERS, generate_corpus
+from cli.batch import run_batch, run_batch_api
+from cli.llm.client import configure_client
+from cli.output.writer import atomic_open, document_id
+from cli.prepare import load_config
+
+DEFAULT_BASELINE = Path(__file__).parent / "baseline.json"
+LOWER_IS_BETTER = ('_ms', '_mb', 'elapsed_s')
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * fraction
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return round(ordered[low] + (ordered[high] - ordered[low]) * (position - low), 2)
+
+def stage_latencies(output_dir: str, files: List[str]) -> Dict[str, Dict[str, Optional[float]]]:
+    samples: Dict[str, List[float]] = {}
+    for path in files:
+        metrics_path = Path(output_dir) / document_id(path) / "metrics.json"
+        try:
+            with open(metrics_path, 'r', encoding='utf-8') as f:
+                metrics = json.load(f)
+        except (OSError, ValueError):
+            continue
+        samples.setdefault('document', []).append(metrics['total_wall_ms'])
+        for name, record in metrics.get('stages', {}).items():
+            samples.setdefault(name, []).append(record['wall_ms'])
+    return {
+        name: {'count': len(values), 'p50_ms': percentile(values, 0.5), 'p95_ms': percentile(values, 0.95)}
+        for name, values in sorted(samples.items())
+    }
+
+def flatten_results(report: Dict[str, Any]) -> Dict[str, float]:
+    flat = {
+        'docs_per_min': report['throughput']['docs_per_min'],
+        'tokens_per_s': report['throughput']['tokens_per_s'],
+        'elapsed_s': report['throughput']['elapsed_s'],
+        'peak_rss_mb': report['peak_rss_mb'],
+    }
+    for name, latency in report['stages'].items():
+        flat[f"{name}.p50_ms"] = latency['p50_ms']
+        flat[f"{name}.p95_ms"] = latency['p95_ms']
+    return {name: value for name, value in flat.items() if value is not None}
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[Dict[str, Any]]:
+    rows = []
+    current_values = flatten_results(current)
+    baseline_values = flatten_results(baseline)
+    for name, value in current_values.items():
+        previous = baseline_values.get(name)
+        if previous is None:
+            continue
+        change = (value - previous) / previous if previous else 0.0
+        lower_is_better = name.endswith(LOWER_IS_BETTER)
+        worse = change > tolerance if lower_is_better else change < -tolerance
+        rows.append({'metric': name, 'baseline': previous, 'current': value,
+                     'change_pct': round(change * 100, 1), 'regression': worse})
+    return rows
+
+def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    work_dir = Path(args.work_dir or tempfile.mkdtemp(prefix='docprep-bench-'))
+    corpus_dir = work_dir / "corpus"
+    output_dir = work_dir / "output"
+    shutil.rmtree(output_dir, ignore_errors=True)
+
+    files = generate_corpus(
+        str(corpus_dir),
+        documents=args.documents,
+        formats=args.formats,
+        pages=args.pages,
+        tables_per_page=args.tables_per_page,
+        languages=args.languages,
+        seed=args.seed
+    )
+
+    settings = MockSettings(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        ms_per_output_token=args.ms_per_output_token,
+        rate_limit_rate=args.rate_limit_rate,
+        server_error_rate=args.server_error_rate,
+        truncate_rate=args.truncate_rate,
+        seed=args.seed
+    )
+
+    config = load_config(args.config)
+    config.update({
+        'cache_enabled': False,
+        'corpus_format': 'none',
+        'rate_limit_requests_per_min': None,
+        'rate_limit_input_tokens_per_min': None,
+        'rate_limit_output_tokens_per_min': None,
+    })
+    if args.routing_mode:
+        config['routing_mode'] = args.routing_mode
+    if args.extraction_mode:
+        config['extraction_mode'] = args.extraction_mode
+    if args.batch_api:
+        config['batch_api_poll_seconds'] = args.batch_poll_seconds
+
+    with MockAnthropicServer(settings) as server:
+        config['anthropic_base_url'] = server.base_url
+        configure_client(config)
+        if args.batch_api:
+            summary = run_batch_api(
+                files=files,
+                output_dir=str(output_dir),
+                config=config,
+                api_key='bench-key',
+                run_coverage=not args.no_coverage,
+                extract_workers=args.extract_workers
+            )
+        else:
+            summary = run_batch(
+                files=files,
+                output_dir=str(output_dir),
+                config=config,
+                api_key='bench-key',
+                run_coverage=not args.no_coverage,
+                extract_workers=args.extract_workers,
+                llm_concurrency=args.llm_concurrency
+            )
+        server_stats = dict(server.stats)
+
+    stage_peaks = [record.get('peak_rss_mb') for record in summary['metrics']['stages'].values()]
+    report = {
+        'scenario': {
+            'documents': args.documents,
+            'formats': args.formats,
+            'pages': args.pages,
+            'tables_per_page': args.tables_per_page,
+            'languages': args.languages,
+            'seed': args.seed,
+            'latency_ms': args.latency_ms,
+            'rate_limit_rate': args.rate_limit_rate,
+            'server_error_rate': args.server_error_rate,
+            'truncate_rate': args.truncate_rate,
+            'routing_mode': config.get('routing_mode'),
+            'extraction_mode': config.get('extraction_mode'),
+            'batch_api': args.batch_api,
+        },
+        'throughput': {
+            'elapsed_s': summary['elapsed_s'],
+            'docs_per_min': summary['docs_per_min'],
+            'tokens_per_s': summary['tokens_per_s'],
+            'documents_succeeded': summary['documents_succeeded'],
+            'documents_failed': summary['documents_failed'],
+        },
+        'peak_rss_mb': max([peak for peak in stage_peaks if peak is not None]
+                           + [summary['metrics']['peak_rss_mb'] or 0]),
+        'stages': stage_latencies(str(output_dir), files),
+        'mock_server': server_stats,
+        'llm_client': summary.get('llm_client'),
+        'work_dir': str(work_dir)
+    }
+    if not args.work_dir and not args.keep:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return report
+
+def print_report(report: Dict[str, Any], comparison: Optional[List[Dict[str, Any]]]):
+    throughput = report['throughput']
+    print(f"\n{throughput['documents_succeeded']} documents in {throughput['elapsed_s']}s: "
+          f"{throughput['docs_per_min']} docs/min, {throughput['tokens_per_s']} tokens/s, "
+          f"peak RSS {report['peak_rss_mb']} MB")
+    print(f"Mock server: {report['mock_server']}")
+    print(f"\n{'stage':<16}{'count':>7}{'p50 ms':>12}{'p95 ms':>12}")
+    for name, latency in report['stages'].items():
+        print(f"{name:<16}{latency['count']:>7}{latency['p50_ms']:>12}{latency['p95_ms']:>12}")
+    if comparison:
+        print(f"\n{'metric':<28}{'baseline':>12}{'current':>12}{'change':>10}")
+        for row in comparison:
+            flag = '  REGRESSION' if row['regression'] else ''
+            print(f"{row['metric']:<28}{row['baseline']:>12}{row['current']:>12}{row['change_pct']:>9}%{flag}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the pipeline on a synthetic corpus against a mock Claude API')
+    parser.add_argument('--config', default='config.json', help='Config file path')
+    parser.add_argument('--documents', type=int, default=12, help='Number of synthetic documents')
+    parser.add_argument('--formats', nargs='+', default=['pdf', 'docx', 'txt'], choices=sorted(WRITERS),
+                        help='File formats, assigned round-robin')
+    parser.add_argument('--pages', default='5-20', help='Pages per document, a number or a range like 5-20')
+    parser.add_argument('--tables-per-page', type=float, default=0.3, help='Mean number of tables per page')
+    parser.add_argument('--languages', nargs='+', default=['en'], choices=sorted(WORDS),
+                        help='Languages, assigned round-robin (PDFs fall back to en for ar/zh)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the corpus and the injected failures')
+    parser.add_argument('--latency-ms', type=float, default=200.0, help='Mock response latency')
+    parser.add_argument('--jitter-ms', type=float, default=50.0, help='Uniform jitter added to the latency')
+    parser.add_argument('--ms-per-output-token', type=float, default=0.0, help='Extra latency per output token')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Fraction of requests answered with 429')
+    parser.add_argument('--server-error-rate', type=float, default=0.0, help='Fraction of requests answered with 529')
+    parser.add_argument('--truncate-rate', type=float, default=0.0, help='Fraction of responses cut at max_tokens')
+    parser.add_argument('--routing-mode', choices=['auto', 'local', 'llm'], help='Override routing_mode')
+    parser.add_argument('--extraction-mode', choices=['auto', 'single', 'chunked'], help='Override extraction_mode')
+    parser.add_argument('--no-coverage', action='store_true', help='Skip coverage check')
+    parser.add_argument('--batch-api', action='store_true', help='Run run_batch_api against the mock Message Batches API')
+    parser.add_argument('--batch-poll-seconds', type=float, default=0.2, help='Message Batch status poll interval')
+    parser.add_argument('--extract-workers', type=int, help='Processes used for local text extraction')
+    parser.add_argument('--llm-concurrency', type=int, help='Concurrent Claude API requests')
+    parser.add_argument('--work-dir', help='Directory for the corpus and outputs (default: a temporary directory)')
+    parser.add_argument('--keep', action='store_true', help='Keep the temporary corpus and outputs')
+    parser.add_argument('--report', help='Write the JSON report to this path')
+    parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help='Baseline report to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='Store this run as the baseline')
+    parser.add_argument('--no-baseline', action='store_true', help='Report without comparing against a baseline')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='Relative change that counts as a regression (default: 0.1)')
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.config):
+        print(f"Error: Config file not found: {args.config}")
+        sys.exit(1)
+
+    baseline_path = Path(args.baseline)
+    compare_baseline = not args.save_baseline and not args.no_baseline
+    if compare_baseline and not baseline_path.exists():
+        print(f"Error: Baseline not found: {baseline_path}")
+        print("Record one on this host first with --save-baseline, or pass --no-baseline")
+        sys.exit(1)
+
+    report = run_benchmark(args)
+
+    comparison = None
+    if compare_baseline:
+        with open(baseline_path, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('scenario') != report['scenario']:
+            print(f"WARNING: Baseline scenario differs from this run: {baseline.get('scenario')}")
+        comparison = compare(report, baseline, args.tolerance)
+        report['comparison'] = comparison
+
+    print_report(report, comparison)
+
+    if args.report:
+        with atomic_open(Path(args.report)) as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\nReport written to: {args.report}")
+    if args.save_baseline:
+        with atomic_open(baseline_path) as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\nBaseline written to: {baseline_path}")
+
+    if report['throughput']['documents_failed'] or any(row['regression'] for row in comparison or []):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+import random
+import zipfile
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+WORDS = {
+    'en': ("gender action plan project women men community climate adaptation resilience training "
+           "indicator target baseline finance partner implementation monitoring household access "
+           "energy water agriculture livelihoods participation leadership budget report annex").split(),
+    'fr': ("plan d'action genre projet femmes hommes communauté climat adaptation résilience formation "
+           "indicateur cible référence financement partenaire mise en œuvre suivi ménage accès énergie "
+           "eau agriculture moyens d'existence participation élaboré économie").split(),
+    'es': ("plan de acción de género proyecto mujeres hombres comunidad clima adaptación resiliencia "
+           "capacitación indicador meta línea base financiación socio implementación seguimiento hogar "
+           "acceso energía agua agricultura participación liderazgo presupuesto año").split(),
+    'ar': "خطة عمل النوع الاجتماعي مشروع النساء الرجال المجتمع المناخ التكيف القدرة التدريب المؤشر الهدف".split(),
+    'zh': "性别 行动 计划 项目 妇女 男子 社区 气候 适应 韧性 培训 指标 目标 基线 融资 伙伴 实施 监测".split(),
+}
+COUNTRIES = ['Kenya', 'Bangladesh', 'Peru', 'Senegal', 'Viet Nam', 'Morocco', 'Fiji', 'Colombia']
+PARTNERS = ['MUFG Bank', 'UNDP', 'FAO', 'Acumen', 'IUCN', 'World Bank']
+TABLE_COLUMNS = ['Indicator', 'Baseline', 'Target', 'Responsibility']
+
+class DocumentSpec:
+    def __init__(self, name: str, pages: int, tables_per_page: float, language: str, seed: int):
+        self.name = name
+        self.pages = pages
+        self.tables_per_page = tables_per_page
+        self.language = language
+        self.random = random.Random(seed)
+
+    def sentence(self, words: int = 14) -> str:
+        vocabulary = WORDS[self.language]
+        text = ' '.join(self.random.choice(vocabulary) for _ in range(words))
+        return text[0].upper() + text[1:] + '.'
+
+    def paragraph(self) -> str:
+        return ' '.join(self.sentence(self.random.randint(8, 20)) for _ in range(self.random.randint(2, 5)))
+
+    def table(self) -> List[List[str]]:
+        rows = [TABLE_COLUMNS]
+        for _ in range(self.random.randint(3, 8)):
+            rows.append([self.sentence(4)[:-1], f"{self.random.randint(0, 60)}%",
+                         f"{self.random.randint(40, 100)}%", self.random.choice(PARTNERS)])
+        return rows
+
+    def page_blocks(self, page_number: int) -> List[Dict[str, Any]]:
+        blocks = []
+        if page_number == 1:
+            blocks.append({'kind': 'heading', 'text': f"Gender Action Plan {self.name}"})
+            blocks.append({'kind': 'paragraph', 'text': f"| {self.random.choice(PARTNERS)} | "
+                                                         f"{self.random.choice(COUNTRIES)}"})
+        else:
+            blocks.append({'kind': 'heading', 'text': f"{page_number}. {self.sentence(4)[:-1]}"})
+        tables = int(self.tables_per_page) + (self.random.random() < self.tables_per_page % 1)
+        paragraphs = self.random.randint(3, 6)
+        table_positions = set(self.random.sample(range(paragraphs), min(tables, paragraphs)))
+        for index in range(paragraphs):
+            blocks.append({'kind': 'paragraph', 'text': self.paragraph()})
+            if index in table_positions:
+                blocks.append({'kind': 'table', 'rows': self.table()})
+        return blocks
+
+def _wrap(text: str, width: int) -> List[str]:
+    lines, current = [], ''
+    for word in text.split():
+        if current and len(current) + len(word) + 1 > width:
+            lines.append(current)
+            current = word
+        else:
+            current = f"{current} {word}".strip()
+    if current:
+        lines.append(current)
+    return lines
+
+def write_txt(spec: DocumentSpec, path: Path):
+    pages = []
+    for page_number in range(1, spec.pages + 1):
+        lines = []
+        for block in spec.page_blocks(page_number):
+            if block['kind'] == 'table':
+                lines.extend('\t'.join(row) for row in block['rows'])
+            else:
+                lines.append(block['text'])
+            lines.append('')
+        pages.append('\n'.join(lines))
+    path.write_text('\n'.join(pages), encoding='utf-8')
+
+def _xml_escape(text: str) -> str:
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+def _docx_paragraph(text: str, style: Optional[str] = None) -> str:
+    properties = f'<w:pPr><w:pStyle w:val="{style}"/></w:pPr>' if style else ''
+    return f'<w:p>{properties}<w:r><w:t xml:space="preserve">{_xml_escape(text)}</w:t></w:r></w:p>'
+
+DOCX_NS = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+DOCX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '<Override PartName="/word/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>'
+    '</Types>'
+)
+DOCX_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/></Relationships>'
+)
+DOCX_DOCUMENT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/></Relationships>'
+)
+DOCX_STYLES = (
+    f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><w:styles {DOCX_NS}>'
+    '<w:style w:type="paragraph" w:styleId="Heading1"><w:name w:val="heading 1"/></w:style>'
+    '<w:style w:type="table" w:styleId="TableGrid"><w:name w:val="Table Grid"/></w:style>'
+    '</w:styles>'
+)
+
+def write_docx(spec: DocumentSpec, path: Path):
+    body = []
+    for page_number in range(1, spec.pages + 1):
+        for block in spec.page_blocks(page_number):
+            if block['kind'] == 'heading':
+                body.append(_docx_paragraph(block['text'], 'Heading1'))
+            elif block['kind'] == 'paragraph':
+                body.append(_docx_paragraph(block['text']))
+            else:
+                rows = ''.join(
+                    '<w:tr>' + ''.join(f'<w:tc>{_docx_paragraph(cell)}</w:tc>' for cell in row) + '</w:tr>'
+                    for row in block['rows']
+                )
+                body.append(f'<w:tbl><w:tblPr><w:tblStyle w:val="TableGrid"/></w:tblPr>{rows}</w:tbl>')
+    document = (f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><w:document {DOCX_NS}><w:body>'
+                f'{"".join(body)}<w:sectPr/></w:body></w:document>')
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', DOCX_CONTENT_TYPES)
+        archive.writestr('_rels/.rels', DOCX_RELS)
+        archive.writestr('word/_rels/document.xml.rels', DOCX_DOCUMENT_RELS)
+        archive.writestr('word/styles.xml', DOCX_STYLES)
+        archive.writestr('word/document.xml', document)
+
+PDF_WIDTH, PDF_HEIGHT, PDF_MARGIN = 595, 842, 50
+
+def _pdf_string(text: str) -> str:
+    encoded = text.encode('cp1252', errors='replace').decode('latin-1')
+    return '(' + encoded.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)') + ')'
+
+def _pdf_page_stream(blocks: List[Dict[str, Any]]) -> str:
+    ops = []
+    y = PDF_HEIGHT - PDF_MARGIN
+    for block in blocks:
+        if y < PDF_MARGIN + 40:
+            break
+        if block['kind'] == 'table':
+            rows = block['rows'][:max(1, int((y - PDF_MARGIN) // 16))]
+            col_width = (PDF_WIDTH - 2 * PDF_MARGIN) / len(rows[0])
+            top = y
+            for row in rows:
+                for col, cell in enumerate(row):
+                    ops.append(f"BT /F1 8 Tf {PDF_MARGIN + col * col_width + 3:.1f} {y - 11:.1f} Td "
+                               f"{_pdf_string(cell[:int(col_width // 4)])} Tj ET")
+                y -= 16
+            for line_y in [top - 16 * index for index in range(len(rows) + 1)]:
+                ops.append(f"{PDF_MARGIN} {line_y:.1f} m {PDF_WIDTH - PDF_MARGIN} {line_y:.1f} l S")
+            for col in range(len(rows[0]) + 1):
+                x = PDF_MARGIN + col * col_width
+                ops.append(f"{x:.1f} {top:.1f} m {x:.1f} {y:.1f} l S")
+            y -= 14
+            continue
+        size = 14 if block['kind'] == 'heading' else 10
+        for line in _wrap(block['text'], 60 if size == 14 else 95):
+            if y < PDF_MARGIN:
+                break
+            ops.append(f"BT /F1 {size} Tf {PDF_MARGIN} {y:.1f} Td {_pdf_string(line)} Tj ET")
+            y -= size + 3
+        y -= 8
+    return '\n'.join(ops)
+
+def write_pdf(spec: DocumentSpec, path: Path):
+    streams = [_pdf_page_stream(spec.page_blocks(page_number)) for page_number in range(1, spec.pages + 1)]
+    page_ids = [4 + 2 * index for index in range(len(streams))]
+    objects = {
+        1: "<< /Type /Catalog /Pages 2 0 R >>",
+        2: f"<< /Type /Pages /Kids [{' '.join(f'{pid} 0 R' for pid in page_ids)}] /Count {len(page_ids)} >>",
+        3: "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    }
+    for page_id, stream in zip(page_ids, streams):
+        data = stream.encode('latin-1')
+        objects[page_id] = (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PDF_WIDTH} {PDF_HEIGHT}] "
+                            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>")
+        objects[page_id + 1] = f"<< /Length {len(data)} >>\nstream\n{stream}\nendstream"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for object_id in sorted(objects):
+        offsets[object_id] = len(out)
+        out += f"{object_id} 0 obj\n{objects[object_id]}\nendobj\n".encode('latin-1')
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode('latin-1')
+    for object_id in sorted(objects):
+        out += f"{offsets[object_id]:010d} 00000 n \n".encode('latin-1')
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode('latin-1')
+    path.write_bytes(bytes(out))
+
+WRITERS = {'pdf': write_pdf, 'docx': write_docx, 'txt': write_txt}
+
+def _page_count(pages: str, rng: random.Random) -> int:
+    low, _, high = pages.partition('-')
+    return rng.randint(int(low), int(high or low))
+
+def generate_corpus(
+    output_dir: str,
+    documents: int = 12,
+    formats: List[str] = ('pdf', 'docx', 'txt'),
+    pages: str = '5-20',
+    tables_per_page: float = 0.3,
+    languages: List[str] = ('en',),
+    seed: int = 0
+) -> List[str]:
+    rng = random.Random(seed)
+    corpus_dir = Path(output_dir)
+    corpus_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for index in range(documents):
+        file_format = formats[index % len(formats)]
+        language = languages[index % len(languages)]
+        if file_format == 'pdf' and language in ('ar', 'zh'):
+            language = 'en'
+        name = f"bench-{index:04d}-{language}"
+        spec = DocumentSpec(name, _page_count(pages, rng), tables_per_page, language, rng.randrange(2 ** 32))
+        path = corpus_dir / f"{name}.{file_format}"
+        WRITERS[file_format](spec, path)
+        paths.append(str(path))
+    return paths
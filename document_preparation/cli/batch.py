@@ -0,0 +1,541 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from cli.prepare import (
+    load_env_file,
+    get_api_key,
+    load_config,
+    extract_document,
+    process_document,
+    extraction_cache_key,
+    coverage_cache_key,
+    ocr_candidates,
+    run_ocr,
+    reusable_duplicate,
+)
+from cli.instrumentation import Instrumentation, summarise_metrics
+from cli.llm.batch_api import (
+    MessageBatchRunner,
+    request_id,
+    extraction_from_message,
+    metadata_from_message,
+    coverage_from_message,
+)
+from cli.llm.chunked_extractor import metadata_request, page_hashes
+from cli.llm.claude_extractor import ExtractionError, TruncatedResponseError, extraction_request
+from cli.llm.client import configure_client, get_client
+from cli.llm.coverage_checker import CoverageCheckError, coverage_request
+from cli.llm.local_coverage import score_coverage
+from cli.llm.tokens import counter_from_config, expected_markdown_tokens
+from cli.cache import ExtractionCache, cache_from_config, file_hash
+from cli.dedup import dedup_from_config, minhash_signature
+from cli.output.corpus import corpus_from_config
+from cli.output.search_index import index_from_config
+from cli.output.journal import JobJournal
+from cli.output.writer import OutputWriter, atomic_open, document_id
+from cli.processors.ocr import ocr_available
+from cli.processors.registry import supported_extensions
+from cli.routing import route_document, local_markdown, metadata_source
+
+SUPPORTED_EXTENSIONS = supported_extensions()
+
+def extract_with_metrics(input_file: str, config: Optional[dict] = None):
+    metrics = Instrumentation()
+    with metrics.stage('extract'):
+        extracted = extract_document(input_file, config)
+    return extracted, metrics.stages['extract']
+
+def process_with_metrics(extract_record: Optional[Dict[str, Any]] = None, **kwargs):
+    metrics = Instrumentation()
+    if extract_record:
+        metrics.set_stage('extract', extract_record)
+    document_data = process_document(metrics=metrics, **kwargs)
+    return document_data, metrics.to_dict()
+
+def restore_corpus_rows(corpus, output_dir: str, path: str):
+    writer = OutputWriter(output_dir, os.path.basename(path))
+    document_data = writer.read_document()
+    chunks = writer.read_chunks()
+    if document_data is not None and chunks is not None and corpus.restore(document_data, chunks):
+        print(f"{os.path.basename(path)}: restored corpus rows missing from the previous run")
+
+def collect_inputs(inputs: List[str], manifest: str = None) -> List[str]:
+    candidates = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, files in os.walk(item):
+                candidates.extend(os.path.join(root, name) for name in sorted(files))
+        elif glob.has_magic(item):
+            candidates.extend(sorted(glob.glob(item, recursive=True)))
+        else:
+            candidates.append(item)
+
+    if manifest:
+        base = Path(manifest).parent
+        with open(manifest, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    path = Path(line)
+                    candidates.append(str(path if path.is_absolute() else base / path))
+
+    files = []
+    seen = set()
+    doc_ids: Dict[str, List[str]] = {}
+    for path in candidates:
+        if Path(path).suffix.lower() not in SUPPORTED_EXTENSIONS or not os.path.isfile(path):
+            continue
+        key = os.path.abspath(path)
+        if key not in seen:
+            seen.add(key)
+            files.append(path)
+            doc_ids.setdefault(document_id(path), []).append(path)
+
+    collisions = {doc_id: paths for doc_id, paths in doc_ids.items() if len(paths) > 1}
+    if collisions:
+        details = '; '.join(f"{doc_id}: {', '.join(paths)}" for doc_id, paths in sorted(collisions.items()))
+        raise ValueError(f"Inputs with the same file name would share an output folder ({details})")
+    return files
+
+def summarise_run(files: List[str], results: Dict[str, Dict[str, Any]], start_time: float) -> Dict[str, Any]:
+    elapsed = time.time() - start_time
+    succeeded = [r for r in results.values() if r['status'] == 'SUCCESS']
+    skipped = [r for r in results.values() if r['status'] == 'SKIPPED']
+    tokens = sum(r['token_count'] for r in succeeded)
+
+    return {
+        'started_at': datetime.fromtimestamp(start_time).isoformat(),
+        'elapsed_s': round(elapsed, 2),
+        'documents_total': len(files),
+        'documents_succeeded': len(succeeded),
+        'documents_skipped': len(skipped),
+        'documents_failed': len(results) - len(succeeded) - len(skipped),
+        'docs_per_min': round(len(succeeded) / elapsed * 60, 2) if elapsed > 0 else None,
+        'tokens_per_s': round(tokens / elapsed, 2) if elapsed > 0 else None
+    }
+
+def run_batch(
+    files: List[str],
+    output_dir: str,
+    config: dict,
+    api_key: str,
+    include_year: bool = False,
+    run_coverage: bool = True,
+    extract_workers: int = None,
+    llm_concurrency: int = None,
+    cache: Optional[ExtractionCache] = None,
+    resume: bool = False
+) -> Dict[str, Any]:
+    extract_workers = extract_workers or config.get('extract_workers') or os.cpu_count() or 1
+    extract_config = dict(config, pdf_page_workers=1)
+    detect_tables = config.get('pdf_detect_tables', True)
+    llm_concurrency = llm_concurrency or config.get('llm_concurrency', 4)
+
+    results = {}
+    document_metrics = []
+    start_time = time.time()
+    journal = JobJournal(output_dir)
+    corpus = corpus_from_config(config, output_dir)
+    search_index = index_from_config(config, output_dir)
+    dedup = dedup_from_config(config, output_dir)
+    token_counter = counter_from_config(config, api_key, cache)
+
+    with ProcessPoolExecutor(max_workers=extract_workers) as extract_pool, \
+            ThreadPoolExecutor(max_workers=llm_concurrency) as llm_pool:
+        extract_futures = {}
+        llm_futures = {}
+
+        def submit_llm(path, extracted, extract_record=None):
+            llm_futures[llm_pool.submit(
+                process_with_metrics,
+                extract_record=extract_record,
+                input_file=path,
+                output_dir=output_dir,
+                config=config,
+                api_key=api_key,
+                include_year=include_year,
+                run_coverage=run_coverage,
+                extracted=extracted,
+                cache=cache,
+                journal=journal,
+                resume=resume,
+                corpus=corpus,
+                search_index=search_index,
+                dedup=dedup,
+                token_counter=token_counter
+            )] = path
+
+        digests = {}
+        for path in files:
+            digests[path] = file_hash(path)
+            if resume and journal.is_complete(path, digests[path]):
+                results[path] = {'status': 'SKIPPED'}
+                if corpus:
+                    restore_corpus_rows(corpus, output_dir, path)
+                continue
+            if resume and journal.stage_done(path, digests[path], 'extracted'):
+                submit_llm(path, None)
+                continue
+            if cache:
+                cached = cache.get_extraction(digests[path], os.path.basename(path), detect_tables)
+                if cached is not None:
+                    submit_llm(path, cached)
+                    continue
+            extract_futures[extract_pool.submit(extract_with_metrics, path, extract_config)] = path
+
+        for future in as_completed(extract_futures):
+            path = extract_futures[future]
+            try:
+                extracted, extract_record = future.result()
+            except Exception as e:
+                results[path] = {'status': 'FAILED', 'error': f"Extraction failed: {e}"}
+                continue
+            if cache:
+                cache.put_extraction(digests[path], extracted, detect_tables)
+            submit_llm(path, extracted, extract_record)
+
+        for future in as_completed(llm_futures):
+            path = llm_futures[future]
+            try:
+                document_data, metrics = future.result()
+                document_metrics.append(metrics)
+                results[path] = {'status': 'SUCCESS', 'token_count': document_data.get('token_count', 0)}
+            except Exception as e:
+                results[path] = {'status': 'FAILED', 'error': str(e)}
+
+    if corpus:
+        corpus.close()
+    if search_index:
+        search_index.close()
+    if dedup:
+        dedup.close()
+
+    return {
+        **summarise_run(files, results, start_time),
+        'extract_workers': extract_workers,
+        'llm_concurrency': llm_concurrency,
+        'cache': cache.stats() if cache else None,
+        'corpus': corpus.summary() if corpus else None,
+        'token_counting': token_counter.stats,
+        'metrics': summarise_metrics(document_metrics),
+        'llm_client': get_client(api_key).stats,
+        'documents': results
+    }
+
+def run_batch_api(
+    files: List[str],
+    output_dir: str,
+    config: dict,
+    api_key: str,
+    include_year: bool = False,
+    run_coverage: bool = True,
+    extract_workers: int = None,
+    cache: Optional[ExtractionCache] = None,
+    resume: bool = False
+) -> Dict[str, Any]:
+    extract_workers = extract_workers or config.get('extract_workers') or os.cpu_count() or 1
+    extract_config = dict(config, pdf_page_workers=1)
+    detect_tables = config.get('pdf_detect_tables', True)
+    config = dict(config, extraction_mode='single')
+
+    results = {}
+    document_metrics = []
+    start_time = time.time()
+    journal = JobJournal(output_dir)
+    corpus = corpus_from_config(config, output_dir)
+    search_index = index_from_config(config, output_dir)
+    dedup = dedup_from_config(config, output_dir)
+    token_counter = counter_from_config(config, api_key, cache)
+    runner = MessageBatchRunner(
+        api_key,
+        Path(output_dir) / "message_batches.json",
+        base_url=config.get('anthropic_base_url'),
+        poll_interval=config.get('batch_api_poll_seconds', 30),
+        max_requests=config.get('batch_api_max_requests', 10000)
+    )
+
+    def read_stage(path, stage):
+        if resume and journal.stage_done(path, digests[path], stage):
+            return OutputWriter(output_dir, os.path.basename(path)).read_stage(stage)
+        return None
+
+    digests = {}
+    extracted = {}
+    extract_records = {}
+    with ProcessPoolExecutor(max_workers=extract_workers) as extract_pool:
+        extract_futures = {}
+        for path in files:
+            digests[path] = file_hash(path)
+            if resume and journal.is_complete(path, digests[path]):
+                results[path] = {'status': 'SKIPPED'}
+                if corpus:
+                    restore_corpus_rows(corpus, output_dir, path)
+                continue
+            stage = read_stage(path, 'extracted')
+            if stage is not None:
+                extracted[path] = (stage['text'], stage['structure'], stage['file_profile'], stage['needs_ocr'])
+                continue
+            if cache:
+                cached = cache.get_extraction(digests[path], os.path.basename(path), detect_tables)
+                if cached is not None:
+                    extracted[path] = cached
+                    continue
+            extract_futures[extract_pool.submit(extract_with_metrics, path, extract_config)] = path
+
+        for future in as_completed(extract_futures):
+            path = extract_futures[future]
+            try:
+                extracted[path], extract_records[path] = future.result()
+            except Exception as e:
+                results[path] = {'status': 'FAILED', 'error': f"Extraction failed: {e}"}
+                continue
+            if cache:
+                cache.put_extraction(digests[path], extracted[path], detect_tables)
+
+    for path in extracted:
+        candidates = ocr_candidates(config, path, extracted[path])
+        if candidates and ocr_available():
+            try:
+                extracted[path], _ = run_ocr(config, path, extracted[path], candidates, cache)
+            except Exception as e:
+                print(f"{os.path.basename(path)}: OCR failed, continuing with the text layer: {e}")
+
+    llm_results = {path: {} for path in extracted}
+    markdown = {}
+    llm_resumed = set()
+    local_paths = set()
+    requests = {}
+    request_paths = {}
+    for path, (text, structure, file_profile, needs_ocr) in extracted.items():
+        stage = read_stage(path, 'llm_done')
+        if stage is not None:
+            markdown[path] = stage['llm_data'].get('llm_markdown')
+            llm_resumed.add(path)
+            continue
+        token_count, _ = token_counter.count_text(text)
+        route = route_document(config, text, structure, file_profile, needs_ocr, token_count)['route']
+        if route == 'ocr':
+            continue
+        if cache:
+            cached = cache.get_llm(extraction_cache_key(config, digests[path], include_year,
+                                                        'local' if route == 'local' else 'single'))
+            if cached is not None:
+                markdown[path] = cached['llm_data'].get('llm_markdown')
+                continue
+        if dedup:
+            signature = minhash_signature(text)
+            duplicate = dedup.find(signature, exclude=document_id(path)) if signature else None
+            hashes = page_hashes(structure.get('pages') or structure.get('sections') or [text])
+            if duplicate and reusable_duplicate(config, include_year, duplicate, hashes):
+                print(f"{os.path.basename(path)}: near-duplicate of {duplicate['filename']}, "
+                      f"reusing its extraction instead of a batch request")
+                continue
+        if route == 'local':
+            local_paths.add(path)
+            params = metadata_request(metadata_source(text, structure), config['claude_model'],
+                                      config['claude_max_tokens'], include_year)
+        else:
+            params = extraction_request(text, config['claude_model'], config['claude_max_tokens'], include_year)
+            budget = token_counter.preflight(params, expected_markdown_tokens(text),
+                                             config.get('claude_context_window', 200000))
+            if not budget['fits']:
+                print(f"{os.path.basename(path)}: {budget['reason']}, extracting outside the batch")
+                continue
+        custom_id = request_id('extraction', params)
+        requests[custom_id] = params
+        request_paths.setdefault(custom_id, []).append(path)
+
+    for custom_id, message in runner.run('extraction', requests).items():
+        for path in request_paths[custom_id]:
+            try:
+                if isinstance(message, Exception):
+                    raise ExtractionError(str(message))
+                if path in local_paths:
+                    llm_results[path]['extraction'] = metadata_from_message(
+                        message, local_markdown(*extracted[path][:2])
+                    )
+                else:
+                    llm_results[path]['extraction'] = extraction_from_message(message)
+                markdown[path] = llm_results[path]['extraction'][0].get('llm_markdown')
+            except TruncatedResponseError:
+                print(f"{os.path.basename(path)}: batch response truncated, extracting outside the batch")
+            except ExtractionError as e:
+                llm_results[path]['extraction'] = e
+                markdown[path] = extracted[path][0]
+
+    coverage_mode = config.get('coverage_mode', 'hybrid')
+    requests = {}
+    request_paths = {}
+    if run_coverage and config.get('check_coverage', True) and coverage_mode != 'local':
+        for path, content in markdown.items():
+            if path in llm_resumed and read_stage(path, 'coverage_done') is not None:
+                continue
+            text, structure = extracted[path][:2]
+            content = content or ''
+            if coverage_mode == 'hybrid':
+                local_result = score_coverage(
+                    pages=structure.get('pages', structure.get('sections', [text])),
+                    content=content,
+                    page_threshold=config.get('local_coverage_page_threshold', 0.8)
+                )
+                score = local_result['score']
+                if score is not None and score >= config.get('local_coverage_threshold', 90):
+                    continue
+            if cache and cache.get_llm(coverage_cache_key(config, digests[path], content)) is not None:
+                continue
+            params = coverage_request(text, content, config['claude_model'], config['claude_max_tokens'])
+            custom_id = request_id('coverage', params)
+            requests[custom_id] = params
+            request_paths.setdefault(custom_id, []).append(path)
+
+    for custom_id, message in runner.run('coverage', requests).items():
+        for path in request_paths[custom_id]:
+            if isinstance(message, Exception):
+                llm_results[path]['coverage'] = message
+                continue
+            try:
+                llm_results[path]['coverage'] = coverage_from_message(message)
+            except CoverageCheckError as e:
+                llm_results[path]['coverage'] = e
+
+    for path in extracted:
+        try:
+            document_data, metrics = process_with_metrics(
+                extract_record=extract_records.get(path),
+                input_file=path,
+                output_dir=output_dir,
+                config=config,
+                api_key=api_key,
+                include_year=include_year,
+                run_coverage=run_coverage,
+                extracted=extracted[path],
+                cache=cache,
+                journal=journal,
+                resume=resume,
+                llm_results=llm_results[path],
+                corpus=corpus,
+                search_index=search_index,
+                dedup=dedup,
+                token_counter=token_counter
+            )
+            document_metrics.append(metrics)
+            results[path] = {'status': 'SUCCESS', 'token_count': document_data.get('token_count', 0)}
+        except Exception as e:
+            results[path] = {'status': 'FAILED', 'error': str(e)}
+
+    if corpus:
+        corpus.close()
+    if search_index:
+        search_index.close()
+    if dedup:
+        dedup.close()
+
+    return {
+        **summarise_run(files, results, start_time),
+        'extract_workers': extract_workers,
+        'cache': cache.stats() if cache else None,
+        'corpus': corpus.summary() if corpus else None,
+        'token_counting': token_counter.stats,
+        'metrics': summarise_metrics(document_metrics),
+        'message_batches': runner.state['batches'],
+        'documents': results
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Extract text and metadata from a corpus of documents')
+    parser.add_argument('inputs', nargs='*', help='Input directories, glob patterns or files')
+    parser.add_argument('output_dir', help='Output directory path')
+    parser.add_argument('--manifest', help='File listing one input path per line')
+    parser.add_argument('--config', default='config.json', help='Config file path')
+    parser.add_argument('--no-coverage', action='store_true', help='Skip coverage check')
+    parser.add_argument('--include-year', action='store_true', help='Extract year from document')
+    parser.add_argument('--extract-workers', type=int, help='Processes used for local text extraction')
+    parser.add_argument('--llm-concurrency', type=int, help='Concurrent Claude API requests')
+    parser.add_argument('--no-cache', action='store_true', help='Bypass the extraction cache')
+    parser.add_argument('--resume', action='store_true', help='Skip documents and stages completed by a previous run')
+    parser.add_argument('--batch-api', action='store_true',
+                        help='Submit Claude requests through the Message Batches API and wait for the results')
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.config):
+        print(f"Error: Config file not found: {args.config}")
+        print("Run: cp config.json.example config.json")
+        sys.exit(1)
+
+    if args.manifest and not os.path.exists(args.manifest):
+        print(f"Error: Manifest file not found: {args.manifest}")
+        sys.exit(1)
+
+    try:
+        files = collect_inputs(args.inputs, args.manifest)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    if not files:
+        print("Error: No PDF, DOCX or TXT inputs found")
+        sys.exit(1)
+
+    load_env_file()
+
+    try:
+        config = load_config(args.config)
+        api_key = get_api_key(config)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    configure_client(config)
+
+    if args.batch_api:
+        summary = run_batch_api(
+            files=files,
+            output_dir=args.output_dir,
+            config=config,
+            api_key=api_key,
+            include_year=args.include_year,
+            run_coverage=not args.no_coverage,
+            extract_workers=args.extract_workers,
+            cache=None if args.no_cache else cache_from_config(config),
+            resume=args.resume
+        )
+    else:
+        summary = run_batch(
+            files=files,
+            output_dir=args.output_dir,
+            config=config,
+            api_key=api_key,
+            include_year=args.include_year,
+            run_coverage=not args.no_coverage,
+            extract_workers=args.extract_workers,
+            llm_concurrency=args.llm_concurrency,
+            cache=None if args.no_cache else cache_from_config(config),
+            resume=args.resume
+        )
+
+    Path(args.output_dir).mkdir(parents=True, exist_ok=True)
+    summary_path = Path(args.output_dir) / "batch_summary.json"
+    with atomic_open(summary_path) as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+
+    if summary['documents_skipped']:
+        print(f"\nSkipped {summary['documents_skipped']} documents completed by a previous run")
+    print(f"\nProcessed {summary['documents_succeeded']}/{summary['documents_total']} documents "
+          f"in {summary['elapsed_s']}s ({summary['docs_per_min']} docs/min, {summary['tokens_per_s']} tokens/s)")
+    print(f"Summary written to: {summary_path}")
+
+    if summary['documents_failed']:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
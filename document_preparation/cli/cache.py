@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+STRUCTURE_VERSION = 4
+
+def file_hash(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def make_key(*parts: Any) -> str:
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class ExtractionCache:
+    def __init__(self, cache_dir: str, max_bytes: int = 1024 ** 3):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._size = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = dict(self.__dict__)
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _path(self, namespace: str, key: str) -> Path:
+        return self.cache_dir / namespace / key[:2] / f"{key}.json"
+
+    def _entries(self):
+        if not self.cache_dir.exists():
+            return []
+        return [p for p in self.cache_dir.glob('*/*/*.json') if p.is_file()]
+
+    def get(self, namespace: str, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(namespace, key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                value = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def put(self, namespace: str, key: str, value: Dict[str, Any]):
+        path = self._path(namespace, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(value, f, ensure_ascii=False)
+        size = tmp_path.stat().st_size
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._size is None:
+                self._size = sum(p.stat().st_size for p in self._entries())
+            else:
+                self._size += size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        entries = []
+        for path in self._entries():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+                total -= size
+            except OSError:
+                continue
+        self._size = total
+
+    def get_extraction(
+        self,
+        digest: str,
+        filename: str,
+        detect_tables: bool = True
+    ) -> Optional[Tuple[str, Dict[str, Any], Dict[str, Any], bool]]:
+        cached = self.get('structure', make_key(digest, STRUCTURE_VERSION, detect_tables))
+        if cached is None:
+            return None
+        file_profile = dict(cached['file_profile'], filename=filename)
+        return cached['text'], cached['structure'], file_profile, cached['needs_ocr']
+
+    def put_extraction(
+        self,
+        digest: str,
+        extracted: Tuple[str, Dict[str, Any], Dict[str, Any], bool],
+        detect_tables: bool = True
+    ):
+        text, structure, file_profile, needs_ocr = extracted
+        self.put('structure', make_key(digest, STRUCTURE_VERSION, detect_tables), {
+            'text': text,
+            'structure': structure,
+            'file_profile': file_profile,
+            'needs_ocr': needs_ocr
+        })
+
+    def get_llm(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.get('llm', key)
+
+    def put_llm(self, key: str, llm_result: Dict[str, Any]):
+        self.put('llm', key, llm_result)
+
+    def get_ocr(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.get('ocr', key)
+
+    def put_ocr(self, key: str, ocr_result: Dict[str, Any]):
+        self.put('ocr', key, ocr_result)
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses}
+
+def cache_from_config(config: dict) -> Optional[ExtractionCache]:
+    if not config.get('cache_enabled', True):
+        return None
+    return ExtractionCache(
+        config.get('cache_dir', '.cache'),
+        max_bytes=config.get('cache_max_bytes', 1024 ** 3)
+    )
@@ -0,0 +1,130 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+from array import array
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+TERM = re.compile(r'[^\W_]+')
+NUM_HASHES = 128
+BANDS = 16
+SHINGLE_WORDS = 5
+MIN_WORDS = 50
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS signatures (
+    doc_id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    mime_type TEXT,
+    extraction_key TEXT,
+    signature BLOB NOT NULL,
+    page_hashes TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bands (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    doc_id TEXT NOT NULL,
+    PRIMARY KEY (band, bucket, doc_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS bands_doc ON bands (doc_id);
+"""
+
+def _hash64(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'big')
+
+def minhash_signature(text: str, num_hashes: int = NUM_HASHES, shingle_words: int = SHINGLE_WORDS) -> Optional[List[int]]:
+    words = TERM.findall(text.lower())
+    if len(words) < MIN_WORDS:
+        return None
+    slots: List[Optional[int]] = [None] * num_hashes
+    for start in range(max(1, len(words) - shingle_words + 1)):
+        value = _hash64(' '.join(words[start:start + shingle_words]).encode('utf-8'))
+        slot, value = value % num_hashes, value // num_hashes
+        if slots[slot] is None or value < slots[slot]:
+            slots[slot] = value
+
+    signature = []
+    for slot in range(num_hashes):
+        distance = 0
+        while slots[(slot + distance) % num_hashes] is None:
+            distance += 1
+        signature.append(slots[(slot + distance) % num_hashes] * num_hashes + distance)
+    return signature
+
+def similarity(first: List[int], second: List[int]) -> float:
+    return sum(1 for a, b in zip(first, second) if a == b) / len(first)
+
+def band_buckets(signature: List[int], bands: int = BANDS) -> List[int]:
+    rows = len(signature) // bands
+    return [_hash64(array('Q', signature[band * rows:(band + 1) * rows]).tobytes()) >> 1 for band in range(bands)]
+
+class DedupIndex:
+    def __init__(self, output_dir: str, threshold: float = 0.9):
+        self.path = Path(output_dir) / "dedup_index.sqlite"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.executescript(SCHEMA)
+
+    def find(self, signature: List[int], exclude: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        buckets = band_buckets(signature)
+        conditions = ' OR '.join('(band = ? AND bucket = ?)' for _ in buckets)
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT doc_id, filename, mime_type, extraction_key, signature, page_hashes FROM signatures '
+                f'WHERE doc_id IN (SELECT doc_id FROM bands WHERE {conditions})',
+                [value for band, bucket in enumerate(buckets) for value in (band, bucket)]
+            ).fetchall()
+
+        best = None
+        for row in rows:
+            if row['doc_id'] == exclude:
+                continue
+            score = similarity(signature, array('Q', row['signature']).tolist())
+            if score >= self.threshold and (best is None or score > best['similarity']):
+                best = {
+                    'doc_id': row['doc_id'],
+                    'filename': row['filename'],
+                    'mime_type': row['mime_type'],
+                    'extraction_key': row['extraction_key'],
+                    'similarity': round(score, 3),
+                    'page_hashes': json.loads(row['page_hashes'])
+                }
+        return best
+
+    def add(
+        self,
+        doc_id: str,
+        filename: str,
+        mime_type: str,
+        extraction_key: str,
+        signature: List[int],
+        page_hashes: List[str]
+    ):
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM bands WHERE doc_id = ?', (doc_id,))
+            self._conn.execute('INSERT OR REPLACE INTO signatures VALUES (?, ?, ?, ?, ?, ?)',
+                               (doc_id, filename, mime_type, extraction_key, array('Q', signature).tobytes(),
+                                json.dumps(page_hashes)))
+            self._conn.executemany('INSERT OR IGNORE INTO bands VALUES (?, ?, ?)',
+                                   [(band, bucket, doc_id) for band, bucket in enumerate(band_buckets(signature))])
+
+    def remove(self, doc_id: str):
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM bands WHERE doc_id = ?', (doc_id,))
+            self._conn.execute('DELETE FROM signatures WHERE doc_id = ?', (doc_id,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def dedup_from_config(config: dict, output_dir: str) -> Optional[DedupIndex]:
+    if not config.get('dedup_enabled', True):
+        return None
+    return DedupIndex(output_dir, threshold=config.get('dedup_threshold', 0.9))
@@ -0,0 +1,77 @@
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+def peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return round(peak / (1024 * 1024), 1)
+    return round(peak / 1024, 1)
+
+class Instrumentation:
+    def __init__(self):
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.started = time.perf_counter()
+
+    def _record(self, name: str) -> Dict[str, Any]:
+        return self.stages.setdefault(name, {'calls': 0, 'wall_ms': 0.0, 'cpu_ms': 0.0, 'peak_rss_mb': None})
+
+    @contextmanager
+    def stage(self, name: str):
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            record = self._record(name)
+            record['calls'] += 1
+            record['wall_ms'] = round(record['wall_ms'] + (time.perf_counter() - wall_start) * 1000, 2)
+            record['cpu_ms'] = round(record['cpu_ms'] + (time.thread_time() - cpu_start) * 1000, 2)
+            record['peak_rss_mb'] = peak_rss_mb()
+
+    def set_stage(self, name: str, record: Dict[str, Any]):
+        self.stages[name] = record
+
+    def add(self, name: str, values: Optional[Dict[str, Any]]):
+        record = self._record(name)
+        for key, value in (values or {}).items():
+            if isinstance(value, (int, float)):
+                record[key] = record.get(key, 0) + value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'total_wall_ms': round((time.perf_counter() - self.started) * 1000, 2),
+            'peak_rss_mb': peak_rss_mb(),
+            'stages': self.stages
+        }
+
+def summarise_metrics(documents: List[Dict[str, Any]]) -> Dict[str, Any]:
+    stages: Dict[str, Dict[str, Any]] = {}
+    for metrics in documents:
+        for name, record in metrics.get('stages', {}).items():
+            total = stages.setdefault(name, {'documents': 0})
+            total['documents'] += 1
+            for key, value in record.items():
+                if key == 'peak_rss_mb':
+                    if value is not None:
+                        total[key] = max(total.get(key) or 0, value)
+                elif isinstance(value, (int, float)):
+                    total[key] = round(total.get(key, 0) + value, 2)
+
+    for total in stages.values():
+        if 'wall_ms' in total:
+            total['mean_wall_ms'] = round(total['wall_ms'] / total['documents'], 2)
+
+    return {
+        'documents': len(documents),
+        'peak_rss_mb': max((m.get('peak_rss_mb') or 0 for m in documents), default=None),
+        'stages': stages
+    }
@@ -0,0 +1,162 @@
+import anthropic
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+from ..cache import make_key
+from ..output.writer import atomic_open
+from .chunked_extractor import parse_metadata_response
+from .claude_extractor import parse_extraction_response
+from .client import merge_usage, usage_dict
+from .coverage_checker import parse_coverage_response
+
+MAX_BATCH_REQUESTS = 10000
+MAX_BATCH_BYTES = 200 * 1024 * 1024
+REUSABLE_STATUS = ('in_progress', 'canceling', 'ended')
+
+class BatchAPIError(Exception):
+    pass
+
+def request_id(phase: str, params: Dict[str, Any]) -> str:
+    return make_key(phase, params)
+
+class MessageBatchRunner:
+    def __init__(
+        self,
+        api_key: str,
+        state_path: str,
+        base_url: Optional[str] = None,
+        poll_interval: float = 30.0,
+        max_requests: int = MAX_BATCH_REQUESTS,
+        log: Callable[[str], None] = print
+    ):
+        self.client = anthropic.Anthropic(api_key=api_key, base_url=base_url)
+        self.state_path = Path(state_path)
+        self.poll_interval = poll_interval
+        self.max_requests = max_requests
+        self.log = log
+        self.state = self._load()
+
+    def _load(self) -> Dict[str, Any]:
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        state.setdefault('batches', {})
+        state.setdefault('requests', {})
+        return state
+
+    def _save(self):
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_open(self.state_path) as f:
+            json.dump(self.state, f, indent=2)
+
+    def _split(self, requests: Dict[str, Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        groups = []
+        current = []
+        current_bytes = 0
+        for custom_id, params in requests.items():
+            entry = {'custom_id': custom_id, 'params': params}
+            size = len(json.dumps(entry, ensure_ascii=False).encode('utf-8'))
+            if current and (len(current) >= self.max_requests or current_bytes + size > MAX_BATCH_BYTES):
+                groups.append(current)
+                current = []
+                current_bytes = 0
+            current.append(entry)
+            current_bytes += size
+        if current:
+            groups.append(current)
+        return groups
+
+    def submit(self, phase: str, requests: Dict[str, Dict[str, Any]]) -> List[str]:
+        batch_ids = set()
+        pending = {}
+        for custom_id, params in requests.items():
+            batch_id = self.state['requests'].get(custom_id)
+            if batch_id and self.state['batches'].get(batch_id, {}).get('status') in REUSABLE_STATUS:
+                batch_ids.add(batch_id)
+            else:
+                pending[custom_id] = params
+
+        if len(pending) < len(requests):
+            self.log(f"Reusing {len(requests) - len(pending)} {phase} requests from batches {sorted(batch_ids)}")
+
+        for group in self._split(pending):
+            batch = self.client.messages.batches.create(requests=group)
+            self.state['batches'][batch.id] = {
+                'phase': phase,
+                'status': batch.processing_status,
+                'requests': len(group),
+                'created_at': datetime.now().isoformat()
+            }
+            for entry in group:
+                self.state['requests'][entry['custom_id']] = batch.id
+            self._save()
+            batch_ids.add(batch.id)
+            self.log(f"Submitted {phase} batch {batch.id} with {len(group)} requests")
+
+        return sorted(batch_ids)
+
+    def wait(self, batch_ids: List[str]):
+        remaining = set(batch_ids)
+        while remaining:
+            for batch_id in sorted(remaining):
+                batch = self.client.messages.batches.retrieve(batch_id)
+                self.state['batches'][batch_id]['status'] = batch.processing_status
+                counts = batch.request_counts
+                self.log(f"Batch {batch_id}: {batch.processing_status} "
+                         f"({counts.processing} processing, {counts.succeeded} succeeded, "
+                         f"{counts.errored} errored, {counts.expired} expired)")
+                if batch.processing_status == 'ended':
+                    remaining.discard(batch_id)
+            self._save()
+            if remaining:
+                time.sleep(self.poll_interval)
+
+    def results(self, batch_ids: List[str], custom_ids) -> Dict[str, Any]:
+        wanted = set(custom_ids)
+        results = {}
+        for batch_id in batch_ids:
+            for entry in self.client.messages.batches.results(batch_id):
+                if entry.custom_id not in wanted:
+                    continue
+                result = entry.result
+                if result.type == 'succeeded':
+                    results[entry.custom_id] = result.message
+                    continue
+                error = getattr(result, 'error', None)
+                detail = getattr(getattr(error, 'error', None), 'message', None) or result.type
+                results[entry.custom_id] = BatchAPIError(f"Batch request {result.type}: {detail}")
+                self.state['requests'].pop(entry.custom_id, None)
+
+        for custom_id in wanted - set(results):
+            results[custom_id] = BatchAPIError("Batch returned no result for request")
+            self.state['requests'].pop(custom_id, None)
+        self._save()
+        return results
+
+    def run(self, phase: str, requests: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        if not requests:
+            return {}
+        batch_ids = self.submit(phase, requests)
+        self.wait(batch_ids)
+        return self.results(batch_ids, requests)
+
+def extraction_from_message(message: Any) -> Tuple[Dict[str, Any], int, Dict[str, Any]]:
+    parse_start = time.perf_counter()
+    data = parse_extraction_response(message)
+    parse_ms = round((time.perf_counter() - parse_start) * 1000, 2)
+    return data, 0, merge_usage(usage_dict(message), {'retries': 0, 'parse_ms': parse_ms})
+
+def metadata_from_message(message: Any, markdown: str) -> Tuple[Dict[str, Any], int, Dict[str, Any]]:
+    parse_start = time.perf_counter()
+    data = parse_metadata_response(message)
+    parse_ms = round((time.perf_counter() - parse_start) * 1000, 2)
+    data['llm_markdown'] = markdown
+    return data, 0, merge_usage(usage_dict(message), {'retries': 0, 'parse_ms': parse_ms})
+
+def coverage_from_message(message: Any) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    return parse_coverage_response(message), merge_usage(usage_dict(message), {'retries': 0})
@@ -0,0 +1,240 @@
+import anthropic
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+from .claude_extractor import ExtractionError, _continue_markdown, response_text, strip_code_fence
+from .client import LLMClient, get_client, merge_usage, usage_dict
+from .prompts import METADATA_PROMPT_BASE, METADATA_PROMPT_WITH_YEAR, WINDOW_MARKDOWN_PROMPT
+from .schemas import METADATA_TOOL, TOOL_CHOICE, ExtractionResult, tool_input, validate
+from ..processors.utils import approximate_token_count
+
+def split_page_windows(pages: List[str], max_window_tokens: int) -> List[Dict[str, Any]]:
+    windows = []
+    current = []
+    current_tokens = 0
+    first_page = 1
+
+    for page_number, page_text in enumerate(pages, 1):
+        page_tokens = approximate_token_count(page_text)
+        if current and current_tokens + page_tokens > max_window_tokens:
+            windows.append({
+                'window_id': len(windows) + 1,
+                'pages': [first_page, page_number - 1],
+                'text': '\n'.join(current)
+            })
+            current = []
+            current_tokens = 0
+        if not current:
+            first_page = page_number
+        current.append(page_text)
+        current_tokens += page_tokens
+
+    if current:
+        windows.append({
+            'window_id': len(windows) + 1,
+            'pages': [first_page, len(pages)],
+            'text': '\n'.join(current)
+        })
+    return windows
+
+def page_hashes(pages: List[str]) -> List[str]:
+    return [hashlib.sha256(page.encode('utf-8')).hexdigest() for page in pages]
+
+def plan_windows(
+    pages: List[str],
+    max_window_tokens: int,
+    previous_windows: Optional[List[Dict[str, Any]]] = None
+) -> List[Dict[str, Any]]:
+    hashes = page_hashes(pages)
+    reusable = {}
+    for window in previous_windows or []:
+        if window.get('page_hashes') and window.get('llm_markdown') is not None:
+            reusable.setdefault(window['page_hashes'][0], []).append(window)
+
+    windows = []
+    changed = []
+
+    def split_changed():
+        if not changed:
+            return
+        offset = changed[0]
+        for window in split_page_windows([pages[index] for index in changed], max_window_tokens):
+            windows.append({'pages': [window['pages'][0] + offset, window['pages'][1] + offset],
+                            'text': window['text']})
+        changed.clear()
+
+    index = 0
+    while index < len(pages):
+        match = next((window for window in reusable.get(hashes[index], [])
+                      if window['page_hashes'] == hashes[index:index + len(window['page_hashes'])]), None)
+        if match is None:
+            changed.append(index)
+            index += 1
+            continue
+        split_changed()
+        last = index + len(match['page_hashes'])
+        windows.append({'pages': [index + 1, last], 'text': '\n'.join(pages[index:last]),
+                        'llm_markdown': match['llm_markdown']})
+        index = last
+    split_changed()
+
+    for window_id, window in enumerate(windows, 1):
+        window['window_id'] = window_id
+        window['page_hashes'] = hashes[window['pages'][0] - 1:window['pages'][1]]
+    return windows
+
+def _request_text(
+    client: LLMClient,
+    prompt: str,
+    model: str,
+    max_tokens: int,
+    retry_attempts: int,
+    source_text: str,
+    max_continuations: int
+) -> Tuple[str, Dict[str, int]]:
+    call_stats = {'retries': 0, 'continuations': 0}
+    try:
+        response = client.create(
+            retry_attempts=retry_attempts,
+            call_stats=call_stats,
+            model=model,
+            max_tokens=max_tokens,
+            temperature=0,
+            messages=[{"role": "user", "content": prompt}]
+        )
+    except anthropic.APIError as e:
+        raise ExtractionError(f"Claude API error: {str(e)}")
+    text = strip_code_fence(response_text(response))
+    usages = [usage_dict(response)]
+    if response.stop_reason == 'max_tokens':
+        text, continuation_usages = _continue_markdown(client, source_text, text, model, max_tokens,
+                                                       retry_attempts, call_stats, max_continuations)
+        usages.extend(continuation_usages)
+    return text, merge_usage(*usages, call_stats)
+
+def metadata_prompt(first_page_text: str, include_year: bool = False) -> str:
+    prompt_template = METADATA_PROMPT_WITH_YEAR if include_year else METADATA_PROMPT_BASE
+    return prompt_template.format(first_page_text=first_page_text)
+
+def metadata_request(first_page_text: str, model: str, max_tokens: int, include_year: bool = False) -> Dict[str, Any]:
+    return {
+        'model': model,
+        'max_tokens': max_tokens,
+        'temperature': 0,
+        'tools': [METADATA_TOOL],
+        'tool_choice': TOOL_CHOICE,
+        'messages': [{"role": "user", "content": metadata_prompt(first_page_text, include_year)}]
+    }
+
+def parse_metadata_response(response: Any) -> ExtractionResult:
+    data = tool_input(response, METADATA_TOOL['name'])
+    if getattr(response, 'stop_reason', None) == 'max_tokens':
+        raise ExtractionError("Metadata stopped at max_tokens")
+    if data is None:
+        raise ExtractionError("Response did not call record_metadata")
+    errors = validate(data, METADATA_TOOL)
+    if errors:
+        raise ExtractionError(f"Invalid record_metadata input: {', '.join(errors)}")
+    return dict(data)
+
+def _extract_metadata(
+    client: LLMClient,
+    first_page_text: str,
+    model: str,
+    max_tokens: int,
+    include_year: bool,
+    retry_attempts: int
+) -> Tuple[Dict[str, Any], Dict[str, int]]:
+    request = metadata_request(first_page_text, model, max_tokens, include_year)
+    last_error = None
+    usages = []
+    for attempt in range(retry_attempts + 1):
+        call_stats = {'retries': 0}
+        try:
+            response = client.create(retry_attempts=retry_attempts, call_stats=call_stats, **request)
+        except anthropic.APIError as e:
+            raise ExtractionError(f"Claude API error: {str(e)}")
+        usages.append(merge_usage(usage_dict(response), call_stats))
+        try:
+            return parse_metadata_response(response), merge_usage(*usages)
+        except ExtractionError as e:
+            last_error = str(e)
+            usages.append({'retries': 1})
+    raise ExtractionError(f"Metadata extraction failed after {retry_attempts + 1} attempts. Last error: {last_error}")
+
+def extract_metadata_with_claude(
+    markdown: str,
+    first_page_text: str,
+    api_key: str,
+    model: str,
+    max_tokens: int,
+    include_year: bool = False,
+    retry_attempts: int = 2
+) -> Tuple[Dict[str, Any], int, Dict[str, int]]:
+
+    if not api_key or api_key == "YOUR_API_KEY_HERE":
+        raise ExtractionError("Valid API key required")
+
+    start_time = time.time()
+    data, usage = _extract_metadata(get_client(api_key), first_page_text, model, max_tokens,
+                                    include_year, retry_attempts)
+    data['llm_markdown'] = markdown
+    return data, int((time.time() - start_time) * 1000), usage
+
+def extract_with_claude_chunked(
+    pages: List[str],
+    api_key: str,
+    model: str,
+    max_tokens: int,
+    include_year: bool = False,
+    retry_attempts: int = 2,
+    max_window_tokens: int = 2500,
+    concurrency: int = 4,
+    previous: Optional[Dict[str, Any]] = None,
+    max_continuations: int = 3
+) -> Tuple[Dict[str, Any], int, Dict[str, int]]:
+
+    if not api_key or api_key == "YOUR_API_KEY_HERE":
+        raise ExtractionError("Valid API key required")
+
+    previous = previous or {}
+    client = get_client(api_key)
+    windows = plan_windows(pages, max_window_tokens, previous.get('windows'))
+    pending = [window for window in windows if 'llm_markdown' not in window]
+    first_page_hash = windows[0]['page_hashes'][0] if windows else None
+    metadata = previous.get('metadata') if previous.get('first_page_hash') == first_page_hash else None
+
+    def convert_window(window: Dict[str, Any]) -> Tuple[str, Dict[str, int]]:
+        prompt = WINDOW_MARKDOWN_PROMPT.format(
+            first_page=window['pages'][0],
+            last_page=window['pages'][1],
+            window_text=window['text']
+        )
+        return _request_text(client, prompt, model, max_tokens, retry_attempts, window['text'], max_continuations)
+
+    start_time = time.time()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        metadata_future = None
+        if metadata is None:
+            metadata_future = pool.submit(
+                _extract_metadata, client, pages[0] if pages else '', model, max_tokens, include_year, retry_attempts
+            )
+        converted = list(pool.map(convert_window, pending))
+        if metadata_future is not None:
+            data, metadata_usage = metadata_future.result()
+        else:
+            data, metadata_usage = dict(metadata), None
+    processing_ms = int((time.time() - start_time) * 1000)
+
+    for window, (markdown, _) in zip(pending, converted):
+        window['llm_markdown'] = markdown
+    usage = merge_usage(metadata_usage, *(window_usage for _, window_usage in converted))
+    usage['reused_windows'] = len(windows) - len(pending)
+
+    data['llm_markdown'] = '\n\n'.join(window['llm_markdown'] for window in windows if window['llm_markdown'])
+    data['llm_windows'] = [
+        {'window_id': window['window_id'], 'pages': window['pages'], 'llm_markdown': window['llm_markdown']}
+        for window in windows
+    ]
+    return data, processing_ms, usage
@@ -1,90 +1,283 @@
 import anthropic
-import json
+import re
 import time
-from typing import Dict, Any, Tuple
-from .prompts import EXTRACTION_PROMPT_BASE, EXTRACTION_PROMPT_WITH_YEAR
+from typing import Dict, Any, List, Optional, TextIO, Tuple
+from .client import _retry_after_seconds, get_client, merge_usage, usage_dict
+from .prompts import (
+    EXTRACTION_PROMPT_BASE,
+    EXTRACTION_PROMPT_WITH_YEAR,
+    CONTINUATION_PROMPT,
+    build_document_messages,
+    system_blocks,
+)
+from .schemas import EXTRACTION_TOOL, TOOLS, TOOL_CHOICE, ExtractionResult, tool_input, validate
+
+CONTINUATION_TAIL_CHARS = 2000
+JSON_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
 
 class ExtractionError(Exception):
     pass
 
-def parse_llm_json(data: str) -> Dict[str, Any]:
-    import re
-    try:
-        return json.loads(data)
-    except Exception:
-        pass
-    
-    data_stripped = data.strip()
-    if data_stripped.startswith('```'):
-        data_stripped = re.sub(r'^```[a-zA-Z]*\n', '', data_stripped)
-        if data_stripped.endswith('```'):
-            data_stripped = re.sub(r'```$', '', data_stripped)
-        data_stripped = data_stripped.strip()
+class TruncatedResponseError(ExtractionError):
+    def __init__(self, message: str, partial: Optional[Dict[str, Any]] = None, usage: Optional[Dict[str, Any]] = None):
+        super().__init__(message)
+        self.partial = partial or {}
+        self.usage = usage
+
+def strip_code_fence(raw: str) -> str:
+    stripped = raw.strip()
+    if stripped.startswith('```'):
+        stripped = re.sub(r'^```[a-zA-Z]*\n', '', stripped)
+        stripped = re.sub(r'```$', '', stripped).strip()
+    return stripped
+
+def response_text(response: Any) -> str:
+    return ''.join(getattr(block, 'text', '') for block in response.content if getattr(block, 'type', None) == 'text')
+
+def join_continuation(markdown: str, continuation: str, max_overlap: int = 500) -> str:
+    continuation = strip_code_fence(continuation)
+    for size in range(min(max_overlap, len(markdown), len(continuation)), 0, -1):
+        if markdown.endswith(continuation[:size]):
+            continuation = continuation[size:]
+            break
+    separator = '' if not markdown or markdown[-1].isspace() or continuation[:1].isspace() else '\n'
+    return markdown + separator + continuation
+
+class JSONStringDecoder:
+    def __init__(self, field: str):
+        self.key = re.compile(r'"%s"\s*:\s*"' % re.escape(field))
+        self.buffer = ''
+        self.position = None
+        self.done = False
+
+    def feed(self, chunk: str) -> str:
+        self.buffer += chunk
+        if self.position is None:
+            match = self.key.search(self.buffer)
+            if match is None:
+                return ''
+            self.position = match.end()
+        decoded = []
+        buffer = self.buffer
+        position = self.position
+        while position < len(buffer) and not self.done:
+            char = buffer[position]
+            if char == '"':
+                self.done = True
+            elif char != '\\':
+                decoded.append(char)
+                position += 1
+            elif position + 1 >= len(buffer):
+                break
+            elif buffer[position + 1] != 'u':
+                decoded.append(JSON_ESCAPES.get(buffer[position + 1], buffer[position + 1]))
+                position += 2
+            else:
+                code = buffer[position + 2:position + 6]
+                if len(code) < 4:
+                    break
+                code = int(code, 16)
+                if 0xD800 <= code < 0xDC00:
+                    low = buffer[position + 8:position + 12]
+                    if len(low) < 4:
+                        break
+                    code = 0x10000 + ((code - 0xD800) << 10) + (int(low, 16) - 0xDC00)
+                    position += 6
+                decoded.append(chr(code))
+                position += 6
+        self.position = position
+        return ''.join(decoded)
+
+class MarkdownStream:
+    def __init__(self, sink: TextIO):
+        self.sink = sink
+        self.markdown = ''
+        self.stop_reason = None
+        self._field = None
+        self._decoder = None
+        self._start = 0
+
+    def begin(self, tool_field: Optional[str] = None, offset: Optional[int] = None):
+        self._field = tool_field
+        self._start = self.sink.tell() if offset is None else offset
+
+    def __call__(self, event: Any):
+        if event.type == 'message_start':
+            self.sink.seek(self._start)
+            self.sink.truncate()
+            self.markdown = ''
+            self.stop_reason = None
+            self._decoder = JSONStringDecoder(self._field) if self._field else None
+        elif event.type == 'content_block_delta':
+            delta = event.delta
+            if delta.type == 'input_json_delta' and self._decoder is not None:
+                text = self._decoder.feed(delta.partial_json)
+            elif delta.type == 'text_delta' and self._decoder is None:
+                text = delta.text
+            else:
+                return
+            if text:
+                self.markdown += text
+                self.sink.write(text)
+                self.sink.flush()
+        elif event.type == 'message_delta':
+            self.stop_reason = event.delta.stop_reason
+
+def extraction_request(
+    text: str,
+    model: str,
+    max_tokens: int,
+    include_year: bool = False,
+    cache_document: bool = False
+) -> Dict[str, Any]:
+    instructions = EXTRACTION_PROMPT_WITH_YEAR if include_year else EXTRACTION_PROMPT_BASE
+    return {
+        'model': model,
+        'max_tokens': max_tokens,
+        'temperature': 0,
+        'system': system_blocks(),
+        'tools': TOOLS,
+        'tool_choice': TOOL_CHOICE,
+        'messages': build_document_messages(text, instructions, cache_document)
+    }
+
+def parse_extraction_response(response: Any) -> ExtractionResult:
+    data = tool_input(response, EXTRACTION_TOOL['name'])
+    if getattr(response, 'stop_reason', None) == 'max_tokens':
+        raise TruncatedResponseError("Extraction stopped at max_tokens", partial=data or {})
+    if data is None:
+        raise ExtractionError("Response did not call record_extraction")
+    errors = validate(data, EXTRACTION_TOOL)
+    if errors:
+        raise ExtractionError(f"Invalid record_extraction input: {', '.join(errors)}")
+    return data
+
+def _continue_markdown(
+    client: Any,
+    text: str,
+    markdown: str,
+    model: str,
+    max_tokens: int,
+    retry_attempts: int,
+    call_stats: Dict[str, Any],
+    max_continuations: int,
+    stream: Optional[MarkdownStream] = None
+) -> Tuple[str, List[Dict[str, int]]]:
+    usages = []
+    for _ in range(max_continuations):
+        call_stats['continuations'] = call_stats.get('continuations', 0) + 1
+        request = {
+            'model': model,
+            'max_tokens': max_tokens,
+            'temperature': 0,
+            'system': system_blocks(),
+            'messages': build_document_messages(
+                text, CONTINUATION_PROMPT.format(tail=markdown[-CONTINUATION_TAIL_CHARS:])
+            )
+        }
         try:
-            return json.loads(data_stripped)
-        except Exception:
-            pass
-    
-    try:
-        match = re.search(r'\{[\s\S]*\}', data)
-        if match:
-            return json.loads(match.group(0))
-    except Exception:
-        pass
-    
-    raise ExtractionError(f"Failed to parse JSON from response: {data[:200]}")
+            if stream is not None:
+                stream.sink.write('\n')
+                stream.begin()
+                response = client.stream(retry_attempts=retry_attempts, call_stats=call_stats,
+                                         on_event=stream, **request)
+            else:
+                response = client.create(retry_attempts=retry_attempts, call_stats=call_stats, **request)
+        except anthropic.APIError as e:
+            raise ExtractionError(f"Claude API error: {str(e)}")
+        usages.append(usage_dict(response))
+        markdown = join_continuation(markdown, response_text(response))
+        if response.stop_reason != 'max_tokens':
+            return markdown, usages
+    raise TruncatedResponseError(f"Markdown still truncated after {max_continuations} continuations",
+                                 partial={}, usage=merge_usage(*usages))
 
 def extract_with_claude(
     text: str,
-    first_page_text: str,
     api_key: str,
     model: str,
     max_tokens: int,
     include_year: bool = False,
-    retry_attempts: int = 2
-) -> Tuple[Dict[str, Any], int]:
+    retry_attempts: int = 2,
+    max_continuations: int = 3,
+    partial_markdown: Optional[TextIO] = None,
+    cache_document: bool = False
+) -> Tuple[ExtractionResult, int, Dict[str, int]]:
     
     if not api_key or api_key == "YOUR_API_KEY_HERE":
         raise ExtractionError("Valid API key required")
     
-    client = anthropic.Anthropic(api_key=api_key)
+    client = get_client(api_key)
     
-    prompt_template = EXTRACTION_PROMPT_WITH_YEAR if include_year else EXTRACTION_PROMPT_BASE
-    full_prompt = prompt_template.format(
-        first_page_text=first_page_text,
-        full_text=text
-    )
+    request = extraction_request(text, model, max_tokens, include_year, cache_document)
     
     last_error = None
+    call_stats = {'retries': 0, 'parse_ms': 0.0, 'continuations': 0}
+    usages = []
+    stream = MarkdownStream(partial_markdown) if partial_markdown is not None else None
     for attempt in range(retry_attempts + 1):
         try:
             start_time = time.time()
-            response = client.messages.create(
-                model=model,
-                max_tokens=max_tokens,
-                temperature=0,
-                messages=[{"role": "user", "content": full_prompt}]
-            )
-            processing_ms = int((time.time() - start_time) * 1000)
+            if stream is not None:
+                stream.begin('llm_markdown', offset=0)
+                response = client.stream(
+                    retry_attempts=retry_attempts,
+                    call_stats=call_stats,
+                    on_event=stream,
+                    **request
+                )
+            else:
+                response = client.create(
+                    retry_attempts=retry_attempts,
+                    call_stats=call_stats,
+                    **request
+                )
+            usages.append(usage_dict(response))
             
-            raw = response.content[0].text
-            data = parse_llm_json(raw)
-            return data, processing_ms
+            parse_start = time.perf_counter()
+            truncated = None
+            try:
+                data = parse_extraction_response(response)
+            except TruncatedResponseError as e:
+                truncated = e
+            finally:
+                call_stats['parse_ms'] += round((time.perf_counter() - parse_start) * 1000, 2)
+            if truncated is not None:
+                partial = truncated.partial
+                markdown = partial.get('llm_markdown')
+                if not isinstance(markdown, str):
+                    markdown = ''
+                if stream is not None and len(stream.markdown) > len(markdown):
+                    markdown = stream.markdown
+                    partial = dict(partial, llm_markdown=markdown)
+                if not markdown or validate(dict(partial, llm_markdown=''), EXTRACTION_TOOL):
+                    raise TruncatedResponseError(str(truncated), partial=partial, usage=merge_usage(*usages, call_stats))
+                try:
+                    markdown, continuation_usages = _continue_markdown(
+                        client, text, markdown, model, max_tokens,
+                        retry_attempts, call_stats, max_continuations, stream
+                    )
+                except TruncatedResponseError as e:
+                    raise TruncatedResponseError(str(e), partial=partial, usage=merge_usage(*usages, e.usage, call_stats))
+                usages.extend(continuation_usages)
+                data = dict(partial, llm_markdown=markdown)
+            processing_ms = int((time.time() - start_time) * 1000)
+            return data, processing_ms, merge_usage(*usages, call_stats)
             
         except anthropic.APIError as e:
-            last_error = f"Claude API error: {str(e)}"
-            if attempt < retry_attempts:
-                time.sleep(2 ** attempt)
-            continue
+            raise ExtractionError(f"Claude API error: {str(e)}")
+        except TruncatedResponseError:
+            raise
         except ExtractionError as e:
             last_error = str(e)
-            if attempt < retry_attempts:
-                time.sleep(2 ** attempt)
+            call_stats['retries'] += 1
             continue
         except Exception as e:
             last_error = f"Unexpected error: {str(e)}"
+            call_stats['retries'] += 1
             if attempt < retry_attempts:
-                time.sleep(2 ** attempt)
+                delay = _retry_after_seconds(e)
+                time.sleep(delay if delay is not None else client._backoff(attempt))
             continue
     
     raise ExtractionError(f"Failed after {retry_attempts + 1} attempts. Last error: {last_error}")
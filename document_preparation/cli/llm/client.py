@@ -0,0 +1,263 @@
+import anthropic
+import asyncio
+import random
+import threading
+import time
+from typing import Dict, Any, Callable, Optional
+
+from ..processors.utils import approximate_token_count
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+USAGE_FIELDS = ('input_tokens', 'output_tokens', 'cache_creation_input_tokens', 'cache_read_input_tokens')
+
+def _content_text(content) -> str:
+    if isinstance(content, str):
+        return content
+    return ''.join(block.get('text', '') for block in content or [] if isinstance(block, dict))
+
+def _message_text(messages) -> str:
+    return ''.join(_content_text(message.get('content', '')) for message in messages)
+
+def usage_dict(response: Any) -> Dict[str, int]:
+    usage = getattr(response, 'usage', None)
+    return {field: getattr(usage, field, None) or 0 for field in USAGE_FIELDS}
+
+def merge_usage(*usages: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    total = dict.fromkeys(USAGE_FIELDS, 0)
+    for usage in usages:
+        for field, value in (usage or {}).items():
+            total[field] = total.get(field, 0) + value
+    return total
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000
+        if headers.get('retry-after'):
+            return float(headers['retry-after'])
+    except ValueError:
+        return None
+    return None
+
+class TokenBucket:
+    def __init__(self, per_minute: Optional[int]):
+        self.capacity = per_minute
+        self.tokens = float(per_minute or 0)
+        self.rate = (per_minute or 0) / 60.0
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: int) -> float:
+        if not self.capacity:
+            return 0.0
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: int):
+        if self.capacity:
+            self.tokens -= min(amount, self.capacity)
+
+    def refund(self, amount: int):
+        if self.capacity:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+class RateLimiter:
+    def __init__(
+        self,
+        requests_per_min: Optional[int] = None,
+        input_tokens_per_min: Optional[int] = None,
+        output_tokens_per_min: Optional[int] = None
+    ):
+        self.requests = TokenBucket(requests_per_min)
+        self.input_tokens = TokenBucket(input_tokens_per_min)
+        self.output_tokens = TokenBucket(output_tokens_per_min)
+        self.paused_until = 0.0
+        self.poll_interval = 0.25
+        self._lock = None
+
+    async def acquire(self, input_tokens: int, output_tokens: int):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                wait = max(
+                    self.paused_until - time.monotonic(),
+                    self.requests.wait_time(1),
+                    self.input_tokens.wait_time(input_tokens),
+                    self.output_tokens.wait_time(output_tokens)
+                )
+                if wait <= 0:
+                    break
+                await asyncio.sleep(min(wait, self.poll_interval))
+            self.requests.consume(1)
+            self.input_tokens.consume(input_tokens)
+            self.output_tokens.consume(output_tokens)
+
+    def settle(self, estimated_output: int, actual_output: int):
+        if actual_output < estimated_output:
+            self.output_tokens.refund(estimated_output - actual_output)
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+class LLMClient:
+    def __init__(
+        self,
+        api_key: str,
+        base_url: Optional[str] = None,
+        max_connections: int = 8,
+        requests_per_min: Optional[int] = None,
+        input_tokens_per_min: Optional[int] = None,
+        output_tokens_per_min: Optional[int] = None,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0
+    ):
+        self.limiter = RateLimiter(requests_per_min, input_tokens_per_min, output_tokens_per_min)
+        self.max_connections = max_connections
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stats = {'requests': 0, 'streams': 0, 'retries': 0, 'rate_limited': 0, 'token_counts': 0, **dict.fromkeys(USAGE_FIELDS, 0)}
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='llm-client', daemon=True)
+        self._thread.start()
+        self._semaphore = None
+        self._client = anthropic.AsyncAnthropic(api_key=api_key, base_url=base_url, max_retries=0)
+
+    def _count_retry(self, call_stats: Optional[Dict[str, Any]]):
+        self.stats['retries'] += 1
+        if call_stats is not None:
+            call_stats['retries'] = call_stats.get('retries', 0) + 1
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def _send(self, call: Callable[[], Any], retry_attempts: int, call_stats: Optional[Dict[str, Any]], kwargs: Dict[str, Any]) -> Any:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_connections)
+
+        input_estimate = approximate_token_count(_content_text(kwargs.get('system')) + _message_text(kwargs.get('messages', [])))
+        output_estimate = kwargs.get('max_tokens', 0)
+
+        for attempt in range(retry_attempts + 1):
+            await self.limiter.acquire(input_estimate, output_estimate)
+            try:
+                async with self._semaphore:
+                    self.stats['requests'] += 1
+                    response = await call()
+            except anthropic.APIStatusError as e:
+                self.limiter.settle(output_estimate, 0)
+                if e.status_code not in RETRYABLE_STATUS or attempt >= retry_attempts:
+                    raise
+                delay = _retry_after_seconds(e)
+                if e.status_code == 429:
+                    self.stats['rate_limited'] += 1
+                    self.limiter.pause(delay if delay is not None else self._backoff(attempt))
+                await asyncio.sleep(delay if delay is not None else self._backoff(attempt))
+                self._count_retry(call_stats)
+                continue
+            except anthropic.APIConnectionError:
+                self.limiter.settle(output_estimate, 0)
+                if attempt >= retry_attempts:
+                    raise
+                await asyncio.sleep(self._backoff(attempt))
+                self._count_retry(call_stats)
+                continue
+
+            usage = usage_dict(response)
+            for field in USAGE_FIELDS:
+                self.stats[field] += usage[field]
+            self.limiter.settle(output_estimate, usage['output_tokens'])
+            return response
+
+    async def acreate(self, retry_attempts: int = 2, call_stats: Optional[Dict[str, Any]] = None, **kwargs) -> Any:
+        return await self._send(lambda: self._client.messages.create(**kwargs), retry_attempts, call_stats, kwargs)
+
+    async def astream(
+        self,
+        retry_attempts: int = 2,
+        call_stats: Optional[Dict[str, Any]] = None,
+        on_event: Optional[Callable[[Any], None]] = None,
+        **kwargs
+    ) -> Any:
+        async def call():
+            started = time.perf_counter()
+            first_token = None
+            async with self._client.messages.stream(**kwargs) as stream:
+                async for event in stream:
+                    if first_token is None and event.type == 'content_block_delta':
+                        first_token = time.perf_counter()
+                    if on_event is not None:
+                        on_event(event)
+                response = await stream.get_final_message()
+            self.stats['streams'] += 1
+            if call_stats is not None:
+                finished = time.perf_counter()
+                call_stats['streams'] = call_stats.get('streams', 0) + 1
+                call_stats['ttft_ms'] = round(call_stats.get('ttft_ms', 0) + ((first_token or finished) - started) * 1000, 2)
+                call_stats['stream_ms'] = round(call_stats.get('stream_ms', 0) + (finished - started) * 1000, 2)
+            return response
+
+        return await self._send(call, retry_attempts, call_stats, kwargs)
+
+    async def acount_tokens(self, **kwargs) -> int:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_connections)
+        async with self._semaphore:
+            self.stats['token_counts'] += 1
+            response = await self._client.messages.count_tokens(**kwargs)
+        return response.input_tokens
+
+    def count_tokens(self, **kwargs) -> int:
+        return asyncio.run_coroutine_threadsafe(self.acount_tokens(**kwargs), self._loop).result()
+
+    def create(self, retry_attempts: int = 2, call_stats: Optional[Dict[str, Any]] = None, **kwargs) -> Any:
+        future = asyncio.run_coroutine_threadsafe(
+            self.acreate(retry_attempts=retry_attempts, call_stats=call_stats, **kwargs),
+            self._loop
+        )
+        return future.result()
+
+    def stream(
+        self,
+        retry_attempts: int = 2,
+        call_stats: Optional[Dict[str, Any]] = None,
+        on_event: Optional[Callable[[Any], None]] = None,
+        **kwargs
+    ) -> Any:
+        future = asyncio.run_coroutine_threadsafe(
+            self.astream(retry_attempts=retry_attempts, call_stats=call_stats, on_event=on_event, **kwargs),
+            self._loop
+        )
+        return future.result()
+
+_client_settings: Dict[str, Any] = {}
+_clients: Dict[str, LLMClient] = {}
+_clients_lock = threading.Lock()
+
+def configure_client(config: dict):
+    _client_settings.update({
+        'base_url': config.get('anthropic_base_url'),
+        'max_connections': config.get('llm_max_connections', 8),
+        'requests_per_min': config.get('rate_limit_requests_per_min'),
+        'input_tokens_per_min': config.get('rate_limit_input_tokens_per_min'),
+        'output_tokens_per_min': config.get('rate_limit_output_tokens_per_min')
+    })
+
+def get_client(api_key: str) -> LLMClient:
+    with _clients_lock:
+        if api_key not in _clients:
+            _clients[api_key] = LLMClient(api_key, **_client_settings)
+        return _clients[api_key]
@@ -1,61 +1,71 @@
 import anthropic
-import json
 import time
-from typing import Dict, Any
-from .prompts import COVERAGE_PROMPT
+from typing import Dict, Any, Tuple
+from .client import _retry_after_seconds, get_client, merge_usage, usage_dict
+from .prompts import COVERAGE_PROMPT, build_document_messages, system_blocks
+from .schemas import COVERAGE_TOOL, TOOLS, TOOL_CHOICE, CoverageResult, tool_input, validate
 
 class CoverageCheckError(Exception):
     pass
 
+def coverage_request(text: str, content: str, model: str, max_tokens: int, cache_document: bool = False) -> Dict[str, Any]:
+    return {
+        'model': model,
+        'max_tokens': max_tokens,
+        'temperature': 0,
+        'system': system_blocks(),
+        'tools': TOOLS,
+        'tool_choice': TOOL_CHOICE,
+        'messages': build_document_messages(text, COVERAGE_PROMPT.format(content=content), cache_document)
+    }
+
+def parse_coverage_response(response: Any) -> CoverageResult:
+    data = tool_input(response, COVERAGE_TOOL['name'])
+    if data is None:
+        raise CoverageCheckError("Response did not call record_coverage")
+    errors = validate(data, COVERAGE_TOOL)
+    if errors:
+        raise CoverageCheckError(f"Invalid record_coverage input: {', '.join(errors)}")
+    return data
+
 def check_coverage(
-    structure: Dict[str, Any],
+    text: str,
     content: str,
     api_key: str,
     model: str,
     max_tokens: int,
-    retry_attempts: int = 2
-) -> Dict[str, Any]:
+    retry_attempts: int = 2,
+    cache_document: bool = False
+) -> Tuple[Dict[str, Any], Dict[str, int]]:
     
     if not api_key or api_key == "YOUR_API_KEY_HERE":
         raise CoverageCheckError("Valid API key required")
     
-    client = anthropic.Anthropic(api_key=api_key)
+    client = get_client(api_key)
     
-    structure_text = ' '.join(structure.get('pages', []))
-    prompt = COVERAGE_PROMPT.format(
-        structure_text=structure_text,
-        content=content
-    )
+    request = coverage_request(text, content, model, max_tokens, cache_document)
     
     last_error = None
+    call_stats = {'retries': 0}
     for attempt in range(retry_attempts + 1):
         try:
-            response = client.messages.create(
-                model=model,
-                max_tokens=max_tokens,
-                temperature=0,
-                messages=[{"role": "user", "content": prompt}]
+            response = client.create(
+                retry_attempts=retry_attempts,
+                call_stats=call_stats,
+                **request
             )
             
-            raw = response.content[0].text
-            start = raw.find('{')
-            end = raw.rfind('}') + 1
-            if start >= 0 and end > start:
-                json_str = raw[start:end]
-                data = json.loads(json_str)
-                return data
-            else:
-                return {"score": None, "text": raw}
+            data = parse_coverage_response(response)
+            return data, merge_usage(usage_dict(response), call_stats)
                 
         except anthropic.APIError as e:
-            last_error = f"Claude API error: {str(e)}"
-            if attempt < retry_attempts:
-                time.sleep(2 ** attempt)
-            continue
+            raise CoverageCheckError(f"Claude API error: {str(e)}")
         except Exception as e:
             last_error = f"Unexpected error: {str(e)}"
+            call_stats['retries'] += 1
             if attempt < retry_attempts:
-                time.sleep(2 ** attempt)
+                delay = _retry_after_seconds(e)
+                time.sleep(delay if delay is not None else client._backoff(attempt))
             continue
     
     raise CoverageCheckError(f"Failed after {retry_attempts + 1} attempts. Last error: {last_error}")
@@ -0,0 +1,49 @@
+import re
+from typing import Dict, Any, List, Set
+
+WORD_PATTERN = re.compile(r'\w+')
+
+def shingles(text: str, size: int = 3) -> Set[tuple]:
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) < size:
+        return {tuple(words)} if words else set()
+    return set(zip(*(words[offset:] for offset in range(size))))
+
+def score_coverage(
+    pages: List[str],
+    content: str,
+    shingle_size: int = 3,
+    page_threshold: float = 0.8
+) -> Dict[str, Any]:
+    content_shingles = shingles(content, shingle_size)
+
+    page_scores = []
+    total = 0
+    matched = 0
+    for page_number, page_text in enumerate(pages, 1):
+        page_shingles = shingles(page_text, shingle_size)
+        if not page_shingles:
+            page_scores.append({'page': page_number, 'coverage': None})
+            continue
+        page_matched = len(page_shingles & content_shingles)
+        total += len(page_shingles)
+        matched += page_matched
+        page_scores.append({'page': page_number, 'coverage': round(page_matched / len(page_shingles), 3)})
+
+    score = round(100 * matched / total) if total else None
+    dropped = [p for p in page_scores if p['coverage'] is not None and p['coverage'] < page_threshold]
+
+    if score is None:
+        text = "The Extracted Text could not be scored because the source has no text."
+    elif dropped:
+        listed = ', '.join(f"{p['page']} ({p['coverage']:.0%})" for p in dropped)
+        text = f"The Extracted Text contains {score}% of the source's word {shingle_size}-grams; low coverage on pages: {listed}"
+    else:
+        text = f"The Extracted Text contains {score}% of the source's word {shingle_size}-grams across all pages"
+
+    return {
+        'score': score,
+        'text': text,
+        'pages': page_scores,
+        'dropped_pages': [p['page'] for p in dropped]
+    }
@@ -1,35 +1,24 @@
+from typing import Dict, Any, List
+
+SYSTEM_PROMPT = """You are an expert at extracting and comparing the content of documents. The first block of the user's message is the source document text. Follow the instructions given after it."""
+
+DOCUMENT_BLOCK = """Here is the PDF text:
+{full_text}
+"""
+
 EXTRACTION_PROMPT_BASE = """
-Below is the full text of the PDF. Please:
+Above is the full text of the PDF. Please:
 1. Extract all text and tables from the PDF and return the entire content as Markdown (llm_markdown), preserving structure and formatting as much as possible.
 2. Extract the document title (from the first page).
 3. Extract the geographic country or countries (from the first page). if there are multiple countries, return a list of countries in a string.
 4. Identify the geographic region based on the country(s). If there are multiple regions, return 'multiple'
 5. Extract the Partner Name (from the first page, found between two '|' characters, e.g., | MUFG Bank | = MUFG Bank).
 
-Return ONLY a single, properly formatted JSON object with the following keys, and do not include any introduction, explanation, code block, or follow-up text. The response MUST be valid JSON and nothing else:
-- llm_markdown (string)
-- title (string)
-- country (string)
-- region (string)
-- partner_name (string)
-
-Example:
-{{
-  "llm_markdown": "...",
-  "title": "...",
-  "country": "...",
-  "region": "...",
-  "partner_name": "..."
-}}
-
-Here is the PDF text:
-{first_page_text}
-
-{full_text}
+Return the result by calling the record_extraction tool with title, country, region, partner_name and llm_markdown. Leave year empty. Do not include any other text.
 """
 
 EXTRACTION_PROMPT_WITH_YEAR = """
-Below is the full text of the PDF. Please:
+Above is the full text of the PDF. Please:
 1. Extract all text and tables from the PDF and return the entire content as Markdown (llm_markdown), preserving structure and formatting as much as possible.
 2. Extract the document title (from the first page).
 3. Extract the geographic country or countries (from the first page). if there are multiple countries, return a list of countries in a string.
@@ -37,35 +26,64 @@ Below is the full text of the PDF. Please:
 5. Extract the Partner Name (from the first page, found between two '|' characters, e.g., | MUFG Bank | = MUFG Bank).
 6. Extract the year of the report.
 
-Return ONLY a single, properly formatted JSON object with the following keys, and do not include any introduction, explanation, code block, or follow-up text. The response MUST be valid JSON and nothing else:
-- llm_markdown (string)
-- title (string)
-- country (string)
-- region (string)
-- partner_name (string)
-- year (string)
-
-Example:
-{{
-  "llm_markdown": "...",
-  "title": "...",
-  "country": "...",
-  "region": "...",
-  "partner_name": "...",
-  "year": "2023"
-}}
-
-Here is the PDF text:
+Return the result by calling the record_extraction tool with title, country, region, partner_name, year and llm_markdown. Do not include any other text.
+"""
+
+CONTINUATION_PROMPT = """
+Above is the full text of the PDF. A Markdown conversion of it (preserving structure, formatting and tables) was cut off by the output limit. It ends with:
+<converted_tail>
+{tail}
+</converted_tail>
+
+Continue the Markdown conversion from exactly where it stops. Do not repeat text that is already converted and do not restart the document. Return ONLY the Markdown continuation, with no introduction, explanation, code block fences, or follow-up text.
+"""
+
+COVERAGE_PROMPT = """You are an expert at document comparison. The text above is the Source PDF (raw extracted text). Below is the Extracted Text (LLM Markdown output):
+{content}
+
+What percentage of the information in the Source PDF is present in the Extracted Text? Evaluate only the text content, not the formatting. Record the result by calling the record_coverage tool with score (an integer between 0 and 100) and text (a short explanation blurb beginning with: The Extracted Text ...)."""
+
+def system_blocks() -> List[Dict[str, Any]]:
+    return [{"type": "text", "text": SYSTEM_PROMPT}]
+
+def build_document_messages(full_text: str, instructions: str, cache_document: bool = False) -> List[Dict[str, Any]]:
+    document = {"type": "text", "text": DOCUMENT_BLOCK.format(full_text=full_text)}
+    if cache_document:
+        document["cache_control"] = {"type": "ephemeral"}
+    return [{"role": "user", "content": [document, {"type": "text", "text": instructions}]}]
+
+METADATA_PROMPT_BASE = """
+Below is the first page of a PDF. Please:
+1. Extract the document title.
+2. Extract the geographic country or countries. if there are multiple countries, return a list of countries in a string.
+3. Identify the geographic region based on the country(s). If there are multiple regions, return 'multiple'
+4. Extract the Partner Name (found between two '|' characters, e.g., | MUFG Bank | = MUFG Bank).
+
+Return the result by calling the record_metadata tool with title, country, region and partner_name. Leave year empty. Do not include any other text.
+
+Here is the first page:
 {first_page_text}
+"""
 
-{full_text}
+METADATA_PROMPT_WITH_YEAR = """
+Below is the first page of a PDF. Please:
+1. Extract the document title.
+2. Extract the geographic country or countries. if there are multiple countries, return a list of countries in a string.
+3. Identify the geographic region based on the country(s). If there are multiple regions, return 'multiple'
+4. Extract the Partner Name (found between two '|' characters, e.g., | MUFG Bank | = MUFG Bank).
+5. Extract the year of the report.
+
+Return the result by calling the record_metadata tool with title, country, region, partner_name and year. Do not include any other text.
+
+Here is the first page:
+{first_page_text}
 """
 
-COVERAGE_PROMPT = """You are an expert at document comparison. Below are two texts:
-Source PDF: (raw extracted text)
-{structure_text}
+WINDOW_MARKDOWN_PROMPT = """
+Below is an excerpt (pages {first_page} to {last_page}) of the text of a PDF. Extract all text and tables from the excerpt and return the content as Markdown, preserving structure and formatting as much as possible. Do not summarise or omit content, and do not add content that is not in the excerpt.
 
-Extracted Text: (LLM Markdown output)
-{content}
+Return ONLY the Markdown, with no introduction, explanation, code block fences, or follow-up text.
 
-What percentage of the information in the Source PDF is present in the Extracted Text? Evaluate only the text content, not the formatting. Respond ONLY with a JSON object in this format: {{"score": <integer between 0 and 100>, "text": "<short explanation blurb beginning with: The Extracted Text ... >"}}"""
+Here is the excerpt:
+{window_text}
+"""
@@ -0,0 +1,80 @@
+from typing import Dict, Any, List, Optional, TypedDict
+
+class ExtractionResult(TypedDict, total=False):
+    title: str
+    country: str
+    region: str
+    partner_name: str
+    year: str
+    llm_markdown: str
+
+class CoverageResult(TypedDict):
+    score: int
+    text: str
+
+EXTRACTION_TOOL = {
+    "name": "record_extraction",
+    "description": "Record the document metadata and the complete Markdown conversion of the document.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "title": {"type": "string", "description": "Document title, from the first page"},
+            "country": {"type": "string", "description": "Country or comma-separated countries, from the first page"},
+            "region": {"type": "string", "description": "Geographic region of the country(s), or 'multiple'"},
+            "partner_name": {"type": "string", "description": "Partner name found between two '|' characters"},
+            "year": {"type": "string", "description": "Year of the report, only when asked for"},
+            "llm_markdown": {"type": "string", "description": "The entire document content as Markdown"}
+        },
+        "required": ["title", "country", "region", "partner_name", "llm_markdown"]
+    }
+}
+
+COVERAGE_TOOL = {
+    "name": "record_coverage",
+    "description": "Record how much of the source document is present in the extracted text.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "score": {"type": "integer", "minimum": 0, "maximum": 100},
+            "text": {"type": "string", "description": "Short explanation beginning with: The Extracted Text ..."}
+        },
+        "required": ["score", "text"]
+    }
+}
+
+METADATA_TOOL = {
+    "name": "record_metadata",
+    "description": "Record the document metadata found on the first page.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "title": {"type": "string", "description": "Document title"},
+            "country": {"type": "string", "description": "Country or comma-separated countries"},
+            "region": {"type": "string", "description": "Geographic region of the country(s), or 'multiple'"},
+            "partner_name": {"type": "string", "description": "Partner name found between two '|' characters"},
+            "year": {"type": "string", "description": "Year of the report, only when asked for"}
+        },
+        "required": ["title", "country", "region", "partner_name"]
+    }
+}
+
+TOOLS = [EXTRACTION_TOOL, COVERAGE_TOOL]
+TOOL_CHOICE = {"type": "any"}
+
+_JSON_TYPES = {'string': str, 'integer': int, 'object': dict}
+
+def tool_input(response: Any, name: str) -> Optional[Dict[str, Any]]:
+    for block in getattr(response, 'content', None) or []:
+        if getattr(block, 'type', None) == 'tool_use' and getattr(block, 'name', None) == name:
+            return block.input if isinstance(block.input, dict) else None
+    return None
+
+def validate(data: Dict[str, Any], tool: Dict[str, Any]) -> List[str]:
+    schema = tool['input_schema']
+    errors = [f"missing {field}" for field in schema['required'] if field not in data]
+    for field, spec in schema['properties'].items():
+        value = data.get(field)
+        expected = _JSON_TYPES.get(spec.get('type'))
+        if value is not None and expected and not isinstance(value, expected):
+            errors.append(f"{field} is not a {spec['type']}")
+    return errors
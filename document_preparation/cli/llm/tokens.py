@@ -0,0 +1,105 @@
+import anthropic
+import threading
+from typing import Dict, Any, Callable, Optional, Tuple
+
+from ..cache import ExtractionCache, make_key
+from ..processors.utils import approximate_token_count
+from .claude_extractor import ExtractionError
+from .client import RETRYABLE_STATUS, get_client, _content_text, _message_text
+
+COUNT_FIELDS = ('model', 'system', 'messages', 'tools', 'tool_choice')
+METADATA_OUTPUT_TOKENS = 150
+MARKDOWN_OUTPUT_RATIO = 1.1
+
+class TokenBudgetError(ExtractionError):
+    pass
+
+def expected_markdown_tokens(text: str) -> int:
+    return int(approximate_token_count(text) * MARKDOWN_OUTPUT_RATIO) + METADATA_OUTPUT_TOKENS
+
+class TokenCounter:
+    def __init__(
+        self,
+        api_key: Optional[str],
+        model: str,
+        cache: Optional[ExtractionCache] = None,
+        use_api: bool = True
+    ):
+        self.api_key = api_key
+        self.model = model
+        self.cache = cache
+        self.use_api = bool(use_api and api_key)
+        self.stats = {'api': 0, 'cached': 0, 'approx': 0}
+        self._lock = threading.Lock()
+
+    def _count(self, source: str):
+        with self._lock:
+            self.stats[source] += 1
+
+    def count_request(self, params: Dict[str, Any], log: Callable[[str], None] = print) -> Tuple[int, str]:
+        request = {field: params[field] for field in COUNT_FIELDS if field in params}
+        if self.use_api:
+            key = make_key('count_tokens', request)
+            cached = self.cache.get('tokens', key) if self.cache else None
+            if cached is not None:
+                self._count('cached')
+                return cached['input_tokens'], 'api'
+            try:
+                input_tokens = get_client(self.api_key).count_tokens(**request)
+            except anthropic.APIError as e:
+                if isinstance(e, anthropic.APIConnectionError) or getattr(e, 'status_code', None) in RETRYABLE_STATUS:
+                    log(f"WARNING: Token counting failed, using local approximation for this request: {e}")
+                else:
+                    log(f"WARNING: Token counting unavailable, using local approximation from now on: {e}")
+                    self.use_api = False
+            else:
+                self._count('api')
+                if self.cache:
+                    self.cache.put('tokens', key, {'input_tokens': input_tokens})
+                return input_tokens, 'api'
+
+        self._count('approx')
+        text = _content_text(request.get('system')) + _message_text(request.get('messages', []))
+        return approximate_token_count(text), 'approx'
+
+    def count_text(self, text: str, log: Callable[[str], None] = print) -> Tuple[int, str]:
+        return self.count_request({'model': self.model, 'messages': [{"role": "user", "content": text}]}, log)
+
+    def preflight(
+        self,
+        params: Dict[str, Any],
+        expected_output_tokens: int,
+        context_window: int,
+        max_continuations: int = 0,
+        log: Callable[[str], None] = print
+    ) -> Dict[str, Any]:
+        input_tokens, source = self.count_request(params, log)
+        max_tokens = params['max_tokens']
+        budget = {
+            'input_tokens': input_tokens,
+            'expected_output_tokens': expected_output_tokens,
+            'max_tokens': max_tokens,
+            'context_window': context_window,
+            'source': source,
+            'fits': True,
+            'continuable': False,
+            'reason': None
+        }
+        if input_tokens + max_tokens > context_window:
+            budget['fits'] = False
+            budget['reason'] = (f"{input_tokens} input + {max_tokens} max output tokens "
+                                f"exceed the {context_window}-token context window")
+        elif expected_output_tokens > max_tokens:
+            budget['fits'] = False
+            budget['continuable'] = expected_output_tokens <= max_tokens * (1 + max_continuations)
+            budget['reason'] = (f"expected output of {expected_output_tokens} tokens "
+                                f"exceeds claude_max_tokens ({max_tokens})")
+        return budget
+
+def counter_from_config(config: dict, api_key: Optional[str], cache: Optional[ExtractionCache] = None) -> TokenCounter:
+    return TokenCounter(
+        api_key,
+        config['claude_model'],
+        cache=cache,
+        use_api=config.get('token_counting', 'api') == 'api'
+    )
@@ -0,0 +1,227 @@
+import gzip
+import json
+import os
+import threading
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+from .writer import document_id
+
+DOCUMENT_COLUMNS = (
+    ('run_id', 'string'),
+    ('doc_id', 'string'),
+    ('filename', 'string'),
+    ('mime_type', 'string'),
+    ('size_bytes', 'int64'),
+    ('page_count', 'int64'),
+    ('token_count', 'int64'),
+    ('needs_ocr', 'bool'),
+    ('title', 'string'),
+    ('country', 'string'),
+    ('region', 'string'),
+    ('partner_name', 'string'),
+    ('year', 'string'),
+    ('llm_markdown', 'string'),
+    ('processing_timestamp', 'string'),
+    ('llm_processing_ms', 'int64'),
+    ('coverage_score', 'float64'),
+    ('coverage_detail', 'string'),
+    ('coverage_method', 'string'),
+    ('coverage_pages', 'json'),
+    ('llm_windows', 'json'),
+    ('llm_usage', 'json'),
+)
+
+CHUNK_COLUMNS = (
+    ('run_id', 'string'),
+    ('doc_id', 'string'),
+    ('chunk_id', 'int64'),
+    ('text', 'string'),
+    ('token_count', 'int64'),
+    ('heading', 'string'),
+    ('contains_table', 'bool'),
+    ('page', 'int64'),
+    ('page_end', 'int64'),
+    ('char_start', 'int64'),
+    ('char_end', 'int64'),
+    ('llm_window', 'int64'),
+)
+
+TABLES = {'documents': DOCUMENT_COLUMNS, 'chunks': CHUNK_COLUMNS}
+
+def _arrow_schema(columns):
+    types = {'string': pa.string(), 'json': pa.string(), 'int64': pa.int64(),
+             'float64': pa.float64(), 'bool': pa.bool_()}
+    return pa.schema([(name, types[kind]) for name, kind in columns])
+
+def _coerce(value: Any, kind: str) -> Any:
+    if value is None:
+        return None
+    if kind == 'json':
+        return json.dumps(value, ensure_ascii=False)
+    if kind == 'string' and not isinstance(value, str):
+        return str(value)
+    try:
+        if kind == 'int64':
+            return int(value)
+        if kind == 'float64':
+            return float(value)
+    except (TypeError, ValueError):
+        return None
+    return value
+
+def document_row(run_id: str, document_data: Dict[str, Any]) -> Dict[str, Any]:
+    row = dict(document_data, run_id=run_id, doc_id=document_id(document_data['filename']))
+    return {name: _coerce(row.get(name), kind) for name, kind in DOCUMENT_COLUMNS}
+
+def chunk_row(run_id: str, doc_id: str, chunk: Dict[str, Any]) -> Dict[str, Any]:
+    row = dict(chunk.get('source', {}), **chunk, run_id=run_id, doc_id=doc_id)
+    return {name: _coerce(row.get(name), kind) for name, kind in CHUNK_COLUMNS}
+
+def resolve_format(corpus_format: str) -> Optional[str]:
+    if corpus_format == 'none':
+        return None
+    if corpus_format == 'auto':
+        return 'parquet' if pq else 'jsonl'
+    if corpus_format == 'parquet' and pq is None:
+        raise ValueError("corpus_format 'parquet' requires pyarrow (pip install pyarrow)")
+    return corpus_format
+
+class CorpusWriter:
+    def __init__(self, output_dir: str, corpus_format: str = 'parquet', row_group_documents: int = 64):
+        self.corpus_dir = Path(output_dir) / "corpus"
+        self.format = corpus_format
+        self.row_group_documents = row_group_documents
+        self.run_id = f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+        self.buffers: Dict[str, List[Dict[str, Any]]] = {name: [] for name in TABLES}
+        self.buffered_documents = 0
+        self.documents_written = 0
+        self._writers = {}
+        self._committed: Optional[Set[Tuple[str, Optional[str]]]] = None
+        self._lock = threading.Lock()
+
+    def _part_path(self, table: str) -> Path:
+        suffix = '.parquet' if self.format == 'parquet' else '.jsonl.gz'
+        return self.corpus_dir / table / f"part-{self.run_id}{suffix}"
+
+    def add(self, document_data: Dict[str, Any], chunks: Iterable[Dict[str, Any]]):
+        row = document_row(self.run_id, document_data)
+        chunk_rows = [chunk_row(self.run_id, row['doc_id'], chunk) for chunk in chunks]
+        with self._lock:
+            self.buffers['documents'].append(row)
+            self.buffers['chunks'].extend(chunk_rows)
+            self.buffered_documents += 1
+            if self.buffered_documents >= self.row_group_documents:
+                self._flush()
+
+    def restore(self, document_data: Dict[str, Any], chunks: Iterable[Dict[str, Any]]) -> bool:
+        with self._lock:
+            if self._committed is None:
+                self._committed = committed_documents(self.corpus_dir.parent)
+        key = (document_id(document_data['filename']), document_data.get('processing_timestamp'))
+        if key in self._committed:
+            return False
+        self.add(document_data, chunks)
+        return True
+
+    def _flush(self):
+        for table, rows in self.buffers.items():
+            if not rows:
+                continue
+            path = self._part_path(table)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if self.format == 'parquet':
+                schema = _arrow_schema(TABLES[table])
+                if table not in self._writers:
+                    tmp_path = path.with_name(f".{path.name}.tmp")
+                    self._writers[table] = (pq.ParquetWriter(tmp_path, schema, compression='zstd'), tmp_path)
+                self._writers[table][0].write_table(pa.Table.from_pylist(rows, schema=schema))
+            else:
+                with gzip.open(path, 'at', encoding='utf-8') as f:
+                    for row in rows:
+                        f.write(json.dumps(row, ensure_ascii=False) + '\n')
+            self.buffers[table] = []
+        self.documents_written += self.buffered_documents
+        self.buffered_documents = 0
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            for table, (writer, tmp_path) in self._writers.items():
+                writer.close()
+                os.replace(tmp_path, self._part_path(table))
+            self._writers = {}
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'format': self.format,
+            'run_id': self.run_id,
+            'documents': self.documents_written,
+            'paths': {table: str(self._part_path(table)) for table in TABLES}
+        }
+
+def corpus_from_config(config: dict, output_dir: str) -> Optional[CorpusWriter]:
+    corpus_format = resolve_format(config.get('corpus_format', 'auto'))
+    if corpus_format is None:
+        return None
+    return CorpusWriter(output_dir, corpus_format, row_group_documents=config.get('corpus_row_group_documents', 64))
+
+def _part_files(table_dir: Path) -> List[Path]:
+    return sorted(p for p in table_dir.glob('part-*') if p.suffix == '.parquet' or p.name.endswith('.jsonl.gz'))
+
+def committed_documents(output_dir: str) -> Set[Tuple[str, Optional[str]]]:
+    committed = set()
+    for path in _part_files(Path(output_dir) / "corpus" / "documents"):
+        try:
+            if path.suffix == '.parquet':
+                if pq is None:
+                    continue
+                rows = pq.read_table(path, columns=['doc_id', 'processing_timestamp']).to_pylist()
+                committed.update((row['doc_id'], row['processing_timestamp']) for row in rows)
+            else:
+                with gzip.open(path, 'rt', encoding='utf-8') as f:
+                    for line in f:
+                        if line.strip():
+                            row = json.loads(line)
+                            committed.add((row['doc_id'], row.get('processing_timestamp')))
+        except (OSError, EOFError, ValueError):
+            continue
+    return committed
+
+def load_corpus(output_dir: str, table: str = 'documents', columns: Optional[List[str]] = None):
+    import pandas as pd
+
+    if table not in TABLES:
+        raise ValueError(f"Unknown corpus table: {table}")
+    known = [name for name, _ in TABLES[table]]
+    wanted = list(columns) if columns else known
+    unknown = [name for name in wanted if name not in known]
+    if unknown:
+        raise ValueError(f"Unknown {table} columns: {unknown}")
+    read_columns = wanted + [name for name in ('run_id', 'doc_id') if name not in wanted]
+
+    frames = []
+    for path in _part_files(Path(output_dir) / "corpus" / table):
+        if path.suffix == '.parquet':
+            if pq is None:
+                raise ValueError(f"Reading {path.name} requires pyarrow (pip install pyarrow)")
+            frames.append(pq.read_table(path, columns=read_columns, memory_map=True).to_pandas())
+        else:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                rows = [json.loads(line) for line in f if line.strip()]
+            frames.append(pd.DataFrame([{name: row.get(name) for name in read_columns} for row in rows],
+                                       columns=read_columns))
+
+    if not frames:
+        return pd.DataFrame(columns=wanted)
+    frame = pd.concat(frames, ignore_index=True)
+    latest = frame.groupby('doc_id')['run_id'].transform('max')
+    return frame[frame['run_id'] == latest][wanted].reset_index(drop=True)
@@ -0,0 +1,67 @@
+import json
+import os
+import threading
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+STAGES = ('extracted', 'llm_done', 'coverage_done', 'written')
+
+class JobJournal:
+    def __init__(self, output_dir: str):
+        self.path = Path(output_dir) / "journal.jsonl"
+        self.state: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    @staticmethod
+    def _key(input_file: str) -> str:
+        return os.path.abspath(input_file)
+
+    def load(self):
+        self.state = {}
+        if not self.path.exists():
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                doc = self.state.setdefault(entry['input'], {'hash': None, 'stages': {}})
+                if entry.get('hash') != doc['hash']:
+                    doc['hash'] = entry.get('hash')
+                    doc['stages'] = {}
+                doc['stages'][entry['stage']] = entry
+
+    def record(self, input_file: str, digest: str, stage: str, status: str = 'done', error: Optional[str] = None):
+        entry = {
+            'input': self._key(input_file),
+            'hash': digest,
+            'stage': stage,
+            'status': status,
+            'timestamp': datetime.now().isoformat()
+        }
+        if error:
+            entry['error'] = error
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            doc = self.state.setdefault(entry['input'], {'hash': None, 'stages': {}})
+            if doc['hash'] != digest:
+                doc['hash'] = digest
+                doc['stages'] = {}
+            doc['stages'][stage] = entry
+
+    def stage_done(self, input_file: str, digest: str, stage: str) -> bool:
+        doc = self.state.get(self._key(input_file))
+        if not doc or doc['hash'] != digest:
+            return False
+        entry = doc['stages'].get(stage)
+        return bool(entry) and entry['status'] == 'done'
+
+    def is_complete(self, input_file: str, digest: str) -> bool:
+        return self.stage_done(input_file, digest, 'written')
@@ -0,0 +1,164 @@
+import json
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from .writer import document_id
+
+TERM = re.compile(r'[^\W_]+')
+FACETS = ('country', 'region', 'partner_name', 'year')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_id TEXT PRIMARY KEY,
+    filename TEXT,
+    title TEXT,
+    country TEXT COLLATE NOCASE,
+    region TEXT COLLATE NOCASE,
+    partner_name TEXT COLLATE NOCASE,
+    year TEXT,
+    processing_timestamp TEXT,
+    first_row INTEGER,
+    row_count INTEGER
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS chunks USING fts5(
+    text,
+    heading,
+    doc_id UNINDEXED,
+    chunk_id UNINDEXED,
+    page UNINDEXED,
+    page_end UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+def match_expression(query: str) -> str:
+    return ' OR '.join(f'"{term}"' for term in dict.fromkeys(TERM.findall(query.lower())))
+
+class SearchIndex:
+    def __init__(self, output_dir: str):
+        self.path = Path(output_dir) / "search_index.sqlite"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            try:
+                self._conn.executescript(SCHEMA)
+            except sqlite3.OperationalError as e:
+                self._conn.close()
+                raise ValueError(f"Search index needs SQLite with FTS5: {e}")
+
+    def _remove(self, doc_id: str):
+        row = self._conn.execute('SELECT first_row, row_count FROM documents WHERE doc_id = ?', (doc_id,)).fetchone()
+        if row is None:
+            return
+        self._conn.execute('DELETE FROM chunks WHERE rowid BETWEEN ? AND ?',
+                           (row['first_row'], row['first_row'] + row['row_count'] - 1))
+        self._conn.execute('DELETE FROM documents WHERE doc_id = ?', (doc_id,))
+
+    def add_document(self, document_data: Dict[str, Any], chunks: Iterable[Dict[str, Any]]):
+        doc_id = document_id(document_data['filename'])
+        with self._lock, self._conn:
+            self._remove(doc_id)
+            first_row = self._conn.execute('SELECT COALESCE(MAX(first_row + row_count), 1) FROM documents').fetchone()[0]
+            rows = []
+            for chunk in chunks:
+                source = chunk.get('source', {})
+                rows.append((first_row + len(rows), chunk.get('text') or '', chunk.get('heading'), doc_id,
+                             chunk.get('chunk_id'), source.get('page'), source.get('page_end', source.get('page'))))
+            self._conn.executemany('INSERT INTO chunks (rowid, text, heading, doc_id, chunk_id, page, page_end) '
+                                   'VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+            self._conn.execute(
+                'INSERT INTO documents VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (doc_id, document_data['filename'], document_data.get('title'),
+                 *(None if document_data.get(field) is None else str(document_data[field]) for field in FACETS),
+                 document_data.get('processing_timestamp'), first_row, len(rows))
+            )
+
+    def remove_document(self, doc_id: str):
+        with self._lock, self._conn:
+            self._remove(doc_id)
+
+    def indexed(self) -> Dict[str, Optional[str]]:
+        with self._lock:
+            rows = self._conn.execute('SELECT doc_id, processing_timestamp FROM documents').fetchall()
+        return {row['doc_id']: row['processing_timestamp'] for row in rows}
+
+    def sync(self, output_dir: str) -> Dict[str, int]:
+        indexed = self.indexed()
+        present = set()
+        updated = 0
+        for document_path in sorted(Path(output_dir).glob('*/document.json')):
+            try:
+                with open(document_path, 'r', encoding='utf-8') as f:
+                    document_data = json.load(f)
+                with open(document_path.with_name('chunks.json'), 'r', encoding='utf-8') as f:
+                    chunks = json.load(f)['chunks']
+            except (OSError, ValueError, KeyError):
+                continue
+            doc_id = document_id(document_data['filename'])
+            present.add(doc_id)
+            if indexed.get(doc_id, '') == document_data.get('processing_timestamp'):
+                continue
+            self.add_document(document_data, chunks)
+            updated += 1
+        removed = [doc_id for doc_id in indexed if doc_id not in present]
+        for doc_id in removed:
+            self.remove_document(doc_id)
+        return {'documents': len(present), 'updated': updated, 'removed': len(removed)}
+
+    def search(self, query: str, limit: int = 10, match: bool = False, **facets: Optional[str]) -> List[Dict[str, Any]]:
+        unknown = [field for field in facets if field not in FACETS]
+        if unknown:
+            raise ValueError(f"Unknown facets: {unknown}")
+        filters = {field: str(value) for field, value in facets.items() if value is not None}
+        expression = query if match else match_expression(query)
+        if not expression:
+            return []
+
+        where = ''
+        if filters:
+            conditions = ' AND '.join(f'{field} = ?' for field in filters)
+            where = f' AND doc_id IN (SELECT doc_id FROM documents WHERE {conditions})'
+        sql = ('SELECT doc_id, chunk_id, page, page_end, heading, text, '
+               "snippet(chunks, 0, '[', ']', '...', 24) AS snippet, -bm25(chunks) AS score "
+               f'FROM chunks WHERE chunks MATCH ?{where} ORDER BY rank LIMIT ?')
+        with self._lock:
+            try:
+                rows = self._conn.execute(sql, [expression, *filters.values(), limit]).fetchall()
+            except sqlite3.OperationalError as e:
+                raise ValueError(f"Invalid search expression {expression!r}: {e}")
+        return [dict(row, score=round(row['score'], 4)) for row in rows]
+
+    def facets(self, field: str) -> List[Tuple[str, int]]:
+        if field not in FACETS:
+            raise ValueError(f"Unknown facet: {field}")
+        with self._lock:
+            rows = self._conn.execute(
+                f'SELECT {field}, COUNT(*) FROM documents WHERE {field} IS NOT NULL GROUP BY {field} ORDER BY 2 DESC'
+            ).fetchall()
+        return [(row[0], row[1]) for row in rows]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            documents, chunks = self._conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(row_count), 0) FROM documents'
+            ).fetchone()
+        return {'documents': documents, 'chunks': chunks}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def index_from_config(config: dict, output_dir: str) -> Optional[SearchIndex]:
+    if not config.get('search_index', True):
+        return None
+    try:
+        return SearchIndex(output_dir)
+    except ValueError as e:
+        print(f"WARNING: {e}, search index disabled")
+        return None
@@ -1,14 +1,37 @@
 import json
 import os
+import shutil
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, List, Optional, TextIO
+
+@contextmanager
+def atomic_open(path: Path):
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+def document_id(filename: str) -> str:
+    path = Path(filename)
+    return f"{path.stem}_{path.suffix[1:].lower()}" if path.suffix else path.stem
 
 class OutputWriter:
     def __init__(self, output_dir: str, filename: str):
         self.output_dir = Path(output_dir)
         self.filename = filename
-        self.doc_dir = self.output_dir / Path(filename).stem
+        self.doc_id = document_id(filename)
+        self.doc_dir = self.output_dir / self.doc_id
+        self.stage_dir = self.doc_dir / ".stages"
+        self.partial_markdown_path = self.doc_dir / "llm_markdown.partial.md"
         self.log_entries = []
         
     def setup(self):
@@ -23,21 +46,77 @@ class OutputWriter:
         
     def write_document(self, data: Dict[str, Any]):
         doc_path = self.doc_dir / "document.json"
-        with open(doc_path, 'w', encoding='utf-8') as f:
+        with atomic_open(doc_path) as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
         self.log(f"Wrote document.json")
         
-    def write_chunks(self, chunks: List[Dict[str, Any]]):
+    def read_document(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.doc_dir / "document.json", 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+        
+    def read_chunks(self) -> Optional[List[Dict[str, Any]]]:
+        try:
+            with open(self.doc_dir / "chunks.json", 'r', encoding='utf-8') as f:
+                return json.load(f)['chunks']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def write_chunks(self, chunks: Iterable[Dict[str, Any]]):
         chunks_path = self.doc_dir / "chunks.json"
-        with open(chunks_path, 'w', encoding='utf-8') as f:
-            json.dump({"chunks": chunks}, f, indent=2, ensure_ascii=False)
-        self.log(f"Wrote chunks.json with {len(chunks)} chunks")
+        count = 0
+        with atomic_open(chunks_path) as f:
+            f.write('{\n  "chunks": [')
+            for chunk in chunks:
+                entry = json.dumps(chunk, indent=2, ensure_ascii=False).replace('\n', '\n    ')
+                f.write(('\n    ' if count == 0 else ',\n    ') + entry)
+                count += 1
+            f.write('\n  ]\n}' if count else ']\n}')
+        self.log(f"Wrote chunks.json with {count} chunks")
+        
+    def write_metrics(self, metrics: Dict[str, Any]):
+        with atomic_open(self.doc_dir / "metrics.json") as f:
+            json.dump(metrics, f, indent=2, ensure_ascii=False)
         
     def write_log(self):
         log_path = self.doc_dir / "processing.log"
-        with open(log_path, 'w', encoding='utf-8') as f:
+        with atomic_open(log_path) as f:
             f.write('\n'.join(self.log_entries))
         
+    def open_partial_markdown(self) -> TextIO:
+        return open(self.partial_markdown_path, 'w+', encoding='utf-8')
+        
+    def clear_partial_markdown(self):
+        self.partial_markdown_path.unlink(missing_ok=True)
+        
+    def write_pages(self, data: Dict[str, Any]):
+        with atomic_open(self.doc_dir / "pages.json") as f:
+            json.dump(data, f, ensure_ascii=False)
+        
+    def read_pages(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.doc_dir / "pages.json", 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+        
+    def write_stage(self, stage: str, data: Dict[str, Any]):
+        self.stage_dir.mkdir(parents=True, exist_ok=True)
+        with atomic_open(self.stage_dir / f"{stage}.json") as f:
+            json.dump(data, f, ensure_ascii=False)
+        
+    def read_stage(self, stage: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.stage_dir / f"{stage}.json", 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+        
+    def clear_stages(self):
+        shutil.rmtree(self.stage_dir, ignore_errors=True)
+        
     def finalize(self, status: str = "SUCCESS"):
         self.log(f"Processing complete: {status}")
         self.write_log()
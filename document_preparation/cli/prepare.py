@@ -4,15 +4,37 @@ import os
 import sys
 from pathlib import Path
 from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from cli.processors.pdf import PDFDocumentProcessor
-from cli.processors.docx import DOCXDocumentProcessor
-from cli.processors.text import TextDocumentProcessor
-from cli.llm.claude_extractor import extract_with_claude, ExtractionError
+from cli.processors.chunker import chunk_document
+from cli.processors.ocr import PageOCR, merge_ocr, ocr_available, pdf_page_count
+from cli.processors.registry import get_processor
+from cli.llm.claude_extractor import extract_with_claude, extraction_request, ExtractionError, TruncatedResponseError
+from cli.llm.chunked_extractor import extract_with_claude_chunked, extract_metadata_with_claude, page_hashes, plan_windows
+from cli.llm.client import configure_client, merge_usage
 from cli.llm.coverage_checker import check_coverage, CoverageCheckError
-from cli.output.writer import OutputWriter
+from cli.llm.local_coverage import score_coverage
+from cli.llm.tokens import TokenCounter, TokenBudgetError, counter_from_config, expected_markdown_tokens
+from cli.llm.prompts import (
+    EXTRACTION_PROMPT_BASE,
+    EXTRACTION_PROMPT_WITH_YEAR,
+    METADATA_PROMPT_BASE,
+    METADATA_PROMPT_WITH_YEAR,
+    WINDOW_MARKDOWN_PROMPT,
+    COVERAGE_PROMPT,
+    SYSTEM_PROMPT,
+    DOCUMENT_BLOCK,
+)
+from cli.output.writer import OutputWriter, document_id
+from cli.output.corpus import CorpusWriter
+from cli.output.search_index import SearchIndex, index_from_config
+from cli.output.journal import JobJournal
+from cli.instrumentation import Instrumentation
+from cli.routing import route_document, local_markdown, metadata_source
+from cli.dedup import DedupIndex, dedup_from_config, minhash_signature
+from cli.cache import STRUCTURE_VERSION, ExtractionCache, cache_from_config, file_hash, make_key
 
 def load_env_file(env_path: str = '.env'):
     if not os.path.exists(env_path):
@@ -45,113 +67,574 @@ def load_config(config_path: str) -> dict:
     with open(config_path, 'r') as f:
         return json.load(f)
 
-def detect_processor(file_path: str):
-    ext = Path(file_path).suffix.lower()
-    if ext == '.pdf':
-        return PDFDocumentProcessor()
-    elif ext == '.docx':
-        return DOCXDocumentProcessor()
-    elif ext == '.txt':
-        return TextDocumentProcessor()
-    else:
-        raise ValueError(f"Unsupported file type: {ext}")
+def detect_processor(file_path: str, config: Optional[dict] = None):
+    return get_processor(file_path, config)
 
-def main():
-    parser = argparse.ArgumentParser(description='Extract text and metadata from documents')
-    parser.add_argument('input_file', help='Input file path (PDF, DOCX, or TXT)')
-    parser.add_argument('output_dir', help='Output directory path')
-    parser.add_argument('--config', default='config.json', help='Config file path')
-    parser.add_argument('--no-coverage', action='store_true', help='Skip coverage check')
-    parser.add_argument('--include-year', action='store_true', help='Extract year from document')
-    
-    args = parser.parse_args()
-    
-    if not os.path.exists(args.input_file):
-        print(f"Error: Input file not found: {args.input_file}")
-        sys.exit(1)
-    
-    if not os.path.exists(args.config):
-        print(f"Error: Config file not found: {args.config}")
-        print("Run: cp config.json.example config.json")
-        sys.exit(1)
-    
-    load_env_file()
-    
-    try:
-        config = load_config(args.config)
-        api_key = get_api_key(config)
-    except ValueError as e:
-        print(f"Error: {e}")
-        sys.exit(1)
-    
-    filename = os.path.basename(args.input_file)
-    writer = OutputWriter(args.output_dir, filename)
+def use_chunked_extraction(config: dict, structure: Dict[str, Any], token_count: int) -> bool:
+    if not structure.get('pages'):
+        return False
+    mode = config.get('extraction_mode', 'auto')
+    if mode == 'chunked':
+        return True
+    if mode == 'auto':
+        return token_count > config.get('chunked_threshold_tokens', 6000)
+    return False
+
+def extraction_cache_key(config: dict, digest: str, include_year: bool, kind: str) -> str:
+    if kind == 'local':
+        prompt_template = METADATA_PROMPT_WITH_YEAR if include_year else METADATA_PROMPT_BASE
+        return make_key('extraction-local', digest, STRUCTURE_VERSION, prompt_template, config['claude_model'],
+                        config['claude_max_tokens'], include_year)
+    if kind == 'chunked':
+        prompt_template = METADATA_PROMPT_WITH_YEAR if include_year else METADATA_PROMPT_BASE
+        return make_key('extraction-chunked', digest, prompt_template, WINDOW_MARKDOWN_PROMPT,
+                        config['claude_model'], config['claude_max_tokens'], include_year,
+                        config.get('chunk_window_tokens', 2500))
+    prompt_template = EXTRACTION_PROMPT_WITH_YEAR if include_year else EXTRACTION_PROMPT_BASE
+    return make_key('extraction', digest, SYSTEM_PROMPT, DOCUMENT_BLOCK, prompt_template,
+                    config['claude_model'], config['claude_max_tokens'], include_year)
+
+def page_state_key(config: dict, include_year: bool) -> str:
+    prompt_template = METADATA_PROMPT_WITH_YEAR if include_year else METADATA_PROMPT_BASE
+    return make_key('pages', prompt_template, WINDOW_MARKDOWN_PROMPT, config['claude_model'],
+                    config['claude_max_tokens'], include_year)
+
+def page_state(config: dict, include_year: bool, units: List[str], llm_data: Dict[str, Any]) -> Dict[str, Any]:
+    hashes = page_hashes(units)
+    return {
+        'key': page_state_key(config, include_year),
+        'first_page_hash': hashes[0] if hashes else None,
+        'metadata': {field: value for field, value in llm_data.items() if field not in ('llm_markdown', 'llm_windows')},
+        'windows': [
+            {
+                'pages': window['pages'],
+                'page_hashes': hashes[window['pages'][0] - 1:window['pages'][1]],
+                'llm_markdown': window['llm_markdown']
+            }
+            for window in llm_data['llm_windows']
+        ]
+    }
+
+def coverage_cache_key(config: dict, digest: str, content: str) -> str:
+    return make_key('coverage', digest, SYSTEM_PROMPT, DOCUMENT_BLOCK, COVERAGE_PROMPT,
+                    config['claude_model'], config['claude_max_tokens'], content)
+
+def duplicate_key(config: dict, include_year: bool) -> str:
+    prompt_template = EXTRACTION_PROMPT_WITH_YEAR if include_year else EXTRACTION_PROMPT_BASE
+    metadata_template = METADATA_PROMPT_WITH_YEAR if include_year else METADATA_PROMPT_BASE
+    return make_key('duplicate', SYSTEM_PROMPT, DOCUMENT_BLOCK, prompt_template, metadata_template,
+                    WINDOW_MARKDOWN_PROMPT, config['claude_model'], config['claude_max_tokens'], include_year)
+
+def reusable_duplicate(
+    config: dict,
+    include_year: bool,
+    duplicate: Dict[str, Any],
+    hashes: List[str]
+) -> bool:
+    return duplicate['extraction_key'] == duplicate_key(config, include_year) and duplicate['page_hashes'] == hashes
+
+def fallback_llm_data(text: str, filename: str) -> Dict[str, Any]:
+    return {
+        'llm_markdown': text,
+        'title': filename,
+        'country': None,
+        'region': None,
+        'partner_name': None
+    }
+
+def extract_document(input_file: str, config: Optional[dict] = None):
+    processor = detect_processor(input_file, config)
+    return processor.extract_text(input_file)
+
+def ocr_candidates(config: dict, input_file: str, extracted: Tuple[str, Dict[str, Any], Dict[str, Any], bool]) -> List[int]:
+    _, structure, file_profile, needs_ocr = extracted
+    if (not config.get('ocr_enabled', True) or file_profile.get('type') != 'application/pdf'
+            or 'ocr_pages' in structure):
+        return []
+    pages = structure.get('pages', [])
+    min_chars = config.get('routing_min_chars_per_page', 50)
+    candidates = [index for index, page in enumerate(pages) if len(page.strip()) < min_chars]
+    if needs_ocr and not pages:
+        try:
+            candidates = list(range(pdf_page_count(input_file)))
+        except Exception:
+            candidates = []
+    return candidates
+
+def run_ocr(
+    config: dict,
+    input_file: str,
+    extracted: Tuple[str, Dict[str, Any], Dict[str, Any], bool],
+    candidates: List[int],
+    cache: Optional[ExtractionCache] = None
+) -> Tuple[Tuple[str, Dict[str, Any], Dict[str, Any], bool], Dict[str, Any]]:
+    ocr = PageOCR(
+        workers=config.get('ocr_workers') or os.cpu_count() or 1,
+        dpi=config.get('ocr_dpi', 300),
+        languages=config.get('ocr_languages', 'eng'),
+        cache=cache
+    )
+    results = ocr.ocr_pages(input_file, candidates)
+    page_count = max(len(extracted[1].get('pages', [])), candidates[-1] + 1)
+    extracted = merge_ocr(extracted, page_count, results)
+    return extracted, {
+        'pages': len(results),
+        'text_pages': len(extracted[1]['ocr_pages']),
+        'cached_pages': sum(1 for result in results if result['cached']),
+        'page_ms_total': round(sum(result['ms'] for result in results), 2)
+    }
+
+def process_document(
+    input_file: str,
+    output_dir: str,
+    config: dict,
+    api_key: str,
+    include_year: bool = False,
+    run_coverage: bool = True,
+    extracted: Optional[Tuple[str, Dict[str, Any], Dict[str, Any], bool]] = None,
+    cache: Optional[ExtractionCache] = None,
+    journal: Optional[JobJournal] = None,
+    resume: bool = False,
+    metrics: Optional[Instrumentation] = None,
+    llm_results: Optional[Dict[str, Any]] = None,
+    corpus: Optional[CorpusWriter] = None,
+    search_index: Optional[SearchIndex] = None,
+    dedup: Optional[DedupIndex] = None,
+    token_counter: Optional[TokenCounter] = None
+) -> Dict[str, Any]:
+    metrics = metrics or Instrumentation()
+    token_counter = token_counter or counter_from_config(config, api_key, cache)
+    llm_results = llm_results or {}
+    filename = os.path.basename(input_file)
+    writer = OutputWriter(output_dir, filename)
     writer.setup()
+    digest = None
     
     try:
-        writer.log(f"Detected file type: {Path(args.input_file).suffix}")
-        processor = detect_processor(args.input_file)
+        writer.log(f"Detected file type: {Path(input_file).suffix}")
+        processor = detect_processor(input_file, config)
+        
+        cache_hits = 0
+        cache_misses = 0
+        digest = file_hash(input_file) if cache or journal else None
+        
+        def resumable(stage: str) -> bool:
+            return bool(resume and journal and journal.stage_done(input_file, digest, stage))
+        
+        extracted_resumed = False
+        if extracted is None and resumable('extracted'):
+            stage = writer.read_stage('extracted')
+            if stage is not None:
+                extracted = (stage['text'], stage['structure'], stage['file_profile'], stage['needs_ocr'])
+                extracted_resumed = True
+                writer.log("Resumed extracted text from previous run")
         
-        writer.log("Extracting text from document...")
-        text, structure, file_profile, needs_ocr = processor.extract_text(args.input_file)
+        if extracted is None and cache:
+            extracted = cache.get_extraction(digest, filename, config.get('pdf_detect_tables', True))
+            if extracted is not None:
+                cache_hits += 1
+                writer.log("Loaded extracted text from cache")
+            else:
+                cache_misses += 1
+        
+        if extracted is None:
+            writer.log("Extracting text from document...")
+            with metrics.stage('extract'):
+                extracted = processor.extract_text(input_file)
+            if cache:
+                cache.put_extraction(digest, extracted, config.get('pdf_detect_tables', True))
+        else:
+            writer.log("Using previously extracted text")
+        text, structure, file_profile, needs_ocr = extracted
+        
+        candidates = ocr_candidates(config, input_file, extracted)
+        if candidates and ocr_available():
+            writer.log(f"Running OCR on {len(candidates)} pages without a text layer...")
+            try:
+                with metrics.stage('ocr'):
+                    extracted, ocr_summary = run_ocr(config, input_file, extracted, candidates, cache)
+                metrics.add('ocr', ocr_summary)
+                text, structure, file_profile, needs_ocr = extracted
+                writer.log(f"OCR complete: text found on {ocr_summary['text_pages']}/{ocr_summary['pages']} pages, "
+                           f"{ocr_summary['cached_pages']} from cache ({ocr_summary['page_ms_total']:.0f}ms)")
+            except Exception as e:
+                writer.log(f"WARNING: OCR failed, continuing with the text layer: {e}")
+        elif candidates:
+            writer.log(f"WARNING: {len(candidates)} pages have no text layer and Tesseract OCR is not available")
+        
+        if journal and not extracted_resumed:
+            writer.write_stage('extracted', {
+                'text': text,
+                'structure': structure,
+                'file_profile': file_profile,
+                'needs_ocr': needs_ocr
+            })
+            journal.record(input_file, digest, 'extracted')
         
         if needs_ocr:
             writer.log("WARNING: Document may need OCR")
         
+        page_timings = structure.get('page_timings_ms')
+        if page_timings and 'extract' in metrics.stages:
+            metrics.add('extract', {'pages': len(page_timings), 'page_ms_total': sum(page_timings),
+                                    'page_ms_max': max(page_timings)})
+            slowest = max(range(len(page_timings)), key=page_timings.__getitem__)
+            writer.log(f"Page extraction: {sum(page_timings):.0f}ms total, "
+                       f"{sum(page_timings) / len(page_timings):.1f}ms/page, "
+                       f"slowest page {slowest + 1} ({page_timings[slowest]:.0f}ms)")
+        
         page_count = len(structure.get('pages', structure.get('sections', [text])))
-        token_count = processor.calculate_token_count(text)
-        writer.log(f"Extracted {page_count} pages/sections, {token_count} tokens")
+        token_count, token_source = token_counter.count_text(text, writer.log)
+        writer.log(f"Extracted {page_count} pages/sections, {token_count} tokens ({token_source} count)")
         
-        writer.log("Calling Claude API for enhanced extraction...")
-        try:
-            first_page = structure.get('pages', [text])[0] if structure.get('pages') else text[:2000]
-            
-            llm_data, processing_ms = extract_with_claude(
-                text=text,
-                first_page_text=first_page,
-                api_key=api_key,
-                model=config['claude_model'],
-                max_tokens=config['claude_max_tokens'],
-                include_year=args.include_year,
-                retry_attempts=config['retry_attempts']
+        routing = route_document(config, text, structure, file_profile, needs_ocr, token_count)
+        route = routing['route']
+        writer.log(f"Route: {route} ({routing['reason']}), "
+                   f"estimated saving ${routing['estimated_savings_usd']:.4f} vs full LLM conversion")
+        
+        chunked = route == 'llm' and use_chunked_extraction(config, structure, token_count)
+        window_tokens = config.get('chunk_window_tokens', 2500)
+        units = structure.get('pages') or structure.get('sections')
+        
+        llm_stage = writer.read_stage('llm_done') if resumable('llm_done') else None
+        llm_failed = False
+        
+        signature = None
+        hashes = None
+        duplicate = None
+        duplicate_of = None
+        if dedup:
+            with metrics.stage('dedup'):
+                signature = minhash_signature(text)
+                hashes = page_hashes(units or [text])
+                duplicate = dedup.find(signature, exclude=writer.doc_id) if signature else None
+            if duplicate:
+                known = set(duplicate['page_hashes'])
+                duplicate_of = {
+                    'doc_id': duplicate['doc_id'],
+                    'filename': duplicate['filename'],
+                    'similarity': duplicate['similarity'],
+                    'changed_pages': [number for number, page_hash in enumerate(hashes, 1) if page_hash not in known],
+                    'reuse': None
+                }
+                writer.log(f"Near-duplicate of {duplicate['filename']} (similarity {duplicate['similarity']}, "
+                           f"{len(duplicate_of['changed_pages'])}/{len(hashes)} pages changed)")
+        
+        previous_pages = None
+        if (route == 'llm' and units and llm_stage is None and 'extraction' not in llm_results
+                and config.get('incremental_reprocessing', True)):
+            sources = [(writer, 'the previous run')]
+            if duplicate:
+                sources.append((OutputWriter(output_dir, duplicate['filename']), duplicate['filename']))
+            for source_writer, source in sources:
+                previous_pages = source_writer.read_pages()
+                if not previous_pages or previous_pages.get('key') != page_state_key(config, include_year):
+                    previous_pages = None
+                    continue
+                reused = [window for window in plan_windows(units, window_tokens, previous_pages['windows'])
+                          if 'llm_markdown' in window]
+                if reused:
+                    chunked = True
+                    if source_writer is not writer:
+                        duplicate_of['reuse'] = 'windows'
+                    reused_pages = sum(len(window['page_hashes']) for window in reused)
+                    writer.log(f"Incremental: reusing Markdown for {reused_pages}/{len(units)} unchanged pages "
+                               f"from {source}")
+                    break
+                previous_pages = None
+        
+        duplicate_data = None
+        if (duplicate and llm_stage is None and previous_pages is None and route != 'ocr'
+                and 'extraction' not in llm_results
+                and reusable_duplicate(config, include_year, duplicate, hashes)):
+            original = OutputWriter(output_dir, duplicate['filename']).read_document()
+            if original and original.get('llm_markdown'):
+                duplicate_data = original
+                duplicate_of['reuse'] = 'llm_result'
+        
+        token_budget = None
+        if (route == 'llm' and not chunked and llm_stage is None and duplicate_data is None
+                and 'extraction' not in llm_results):
+            token_budget = token_counter.preflight(
+                extraction_request(text, config['claude_model'], config['claude_max_tokens'], include_year),
+                expected_output_tokens=expected_markdown_tokens(text),
+                context_window=config.get('claude_context_window', 200000),
+                max_continuations=config.get('max_continuations', 3),
+                log=writer.log
             )
-            
-            writer.log(f"Claude extraction complete ({processing_ms}ms)")
+            writer.log(f"Token budget: {token_budget['input_tokens']} input, "
+                       f"~{token_budget['expected_output_tokens']} expected output of {token_budget['max_tokens']}")
+            if not token_budget['fits'] and units:
+                chunked = True
+                writer.log(f"Splitting into windows before calling Claude: {token_budget['reason']}")
+            elif token_budget['continuable']:
+                writer.log(f"Relying on continuation requests: {token_budget['reason']}")
+        extraction_kind = 'local' if route == 'local' else 'chunked' if chunked else 'single'
+        
+        llm_key = None
+        cached_llm = None
+        if cache and llm_stage is None and route != 'ocr':
+            llm_key = extraction_cache_key(config, digest, include_year, extraction_kind)
+            cached_llm = cache.get_llm(llm_key)
+            if cached_llm is not None:
+                cache_hits += 1
+            else:
+                cache_misses += 1
+        
+        extraction_usage = None
+        llm_stream = None
+        cache_document = False
+        try:
+            if llm_stage is not None:
+                llm_data = llm_stage['llm_data']
+                processing_ms = llm_stage['processing_ms']
+                extraction_usage = llm_stage['usage']
+                writer.log("Resumed Claude extraction from previous run")
+            elif cached_llm is not None:
+                llm_data = cached_llm['llm_data']
+                processing_ms = 0
+                writer.log("Loaded Claude extraction from cache")
+            elif 'extraction' in llm_results:
+                if isinstance(llm_results['extraction'], Exception):
+                    raise ExtractionError(str(llm_results['extraction']))
+                llm_data, processing_ms, extraction_usage = llm_results['extraction']
+                metrics.add('llm_extraction', extraction_usage)
+                if cache:
+                    cache.put_llm(llm_key, {'llm_data': llm_data, 'processing_ms': processing_ms})
+                
+                writer.log("Claude extraction complete (Message Batch)")
+            elif duplicate_data is not None:
+                llm_data = {field: duplicate_data.get(field)
+                            for field in ('title', 'country', 'region', 'partner_name', 'llm_markdown')}
+                if include_year:
+                    llm_data['year'] = duplicate_data.get('year')
+                processing_ms = 0
+                writer.log(f"Reused Claude extraction from near-duplicate {duplicate['filename']}")
+            elif route == 'ocr':
+                writer.log("Document needs OCR, skipping Claude extraction")
+                llm_data = fallback_llm_data(text, filename)
+                processing_ms = 0
+            elif route == 'local':
+                writer.log("Converting text locally, calling Claude API for metadata only...")
+                with metrics.stage('llm_extraction'):
+                    llm_data, processing_ms, extraction_usage = extract_metadata_with_claude(
+                        markdown=local_markdown(text, structure),
+                        first_page_text=metadata_source(text, structure),
+                        api_key=api_key,
+                        model=config['claude_model'],
+                        max_tokens=config['claude_max_tokens'],
+                        include_year=include_year,
+                        retry_attempts=config['retry_attempts']
+                    )
+                metrics.add('llm_extraction', extraction_usage)
+                if cache:
+                    cache.put_llm(llm_key, {'llm_data': llm_data, 'processing_ms': processing_ms})
+                
+                writer.log(f"Claude metadata extraction complete ({processing_ms}ms)")
+            elif chunked:
+                writer.log(f"Calling Claude API for chunked extraction ({window_tokens} tokens per window)...")
+                with metrics.stage('llm_extraction'):
+                    llm_data, processing_ms, extraction_usage = extract_with_claude_chunked(
+                        pages=units,
+                        api_key=api_key,
+                        model=config['claude_model'],
+                        max_tokens=config['claude_max_tokens'],
+                        include_year=include_year,
+                        retry_attempts=config['retry_attempts'],
+                        max_window_tokens=window_tokens,
+                        concurrency=config.get('chunk_concurrency', 4),
+                        previous=previous_pages,
+                        max_continuations=config.get('max_continuations', 3)
+                    )
+                metrics.add('llm_extraction', extraction_usage)
+                if cache:
+                    cache.put_llm(llm_key, {'llm_data': llm_data, 'processing_ms': processing_ms})
+                
+                writer.log(f"Claude chunked extraction complete: {len(llm_data['llm_windows'])} windows, "
+                           f"{extraction_usage['reused_windows']} reused from the previous run ({processing_ms}ms)")
+            else:
+                if token_budget and not token_budget['fits'] and not token_budget['continuable']:
+                    raise TokenBudgetError(f"Document exceeds the token budget: {token_budget['reason']}")
+                writer.log("Calling Claude API for enhanced extraction...")
+                cache_document = (run_coverage and config.get('check_coverage', True)
+                                  and config.get('coverage_mode', 'hybrid') == 'llm')
+                partial_markdown = writer.open_partial_markdown() if config.get('stream_responses', True) else None
+                with metrics.stage('llm_extraction'):
+                    try:
+                        llm_data, processing_ms, extraction_usage = extract_with_claude(
+                            text=text,
+                            api_key=api_key,
+                            model=config['claude_model'],
+                            max_tokens=config['claude_max_tokens'],
+                            include_year=include_year,
+                            retry_attempts=config['retry_attempts'],
+                            max_continuations=config.get('max_continuations', 3),
+                            partial_markdown=partial_markdown,
+                            cache_document=cache_document
+                        )
+                    except TruncatedResponseError as e:
+                        if not units:
+                            raise
+                        writer.log(f"Claude output truncated with nothing to continue ({e}), converting page windows instead")
+                        llm_data, processing_ms, extraction_usage = extract_with_claude_chunked(
+                            pages=units,
+                            api_key=api_key,
+                            model=config['claude_model'],
+                            max_tokens=config['claude_max_tokens'],
+                            include_year=include_year,
+                            retry_attempts=config['retry_attempts'],
+                            max_window_tokens=window_tokens,
+                            concurrency=config.get('chunk_concurrency', 4),
+                            max_continuations=config.get('max_continuations', 3)
+                        )
+                        extraction_usage = merge_usage(e.usage, extraction_usage)
+                    finally:
+                        if partial_markdown is not None:
+                            partial_markdown.close()
+                metrics.add('llm_extraction', extraction_usage)
+                writer.clear_partial_markdown()
+                if extraction_usage.get('stream_ms'):
+                    llm_stream = {
+                        'streams': extraction_usage['streams'],
+                        'ttft_ms': round(extraction_usage['ttft_ms'] / extraction_usage['streams'], 2),
+                        'output_tokens_per_s': round(extraction_usage['output_tokens'] / (extraction_usage['stream_ms'] / 1000), 1)
+                    }
+                    writer.log(f"Streamed extraction: first token after {llm_stream['ttft_ms']:.0f}ms, "
+                               f"{llm_stream['output_tokens_per_s']} output tokens/s")
+                if extraction_usage.get('continuations') and not llm_data.get('llm_windows'):
+                    writer.log(f"Recovered truncated Markdown with {extraction_usage['continuations']} continuation requests")
+                if cache:
+                    cache.put_llm(llm_key, {'llm_data': llm_data, 'processing_ms': processing_ms})
+                
+                writer.log(f"Claude extraction complete ({processing_ms}ms)")
             writer.log(f"Extracted metadata: title={llm_data.get('title')}, country={llm_data.get('country')}")
             
+            if journal and llm_stage is None:
+                writer.write_stage('llm_done', {
+                    'llm_data': llm_data,
+                    'processing_ms': processing_ms,
+                    'usage': extraction_usage
+                })
+                journal.record(input_file, digest, 'llm_done')
+            
         except ExtractionError as e:
+            llm_failed = True
+            if journal:
+                journal.record(input_file, digest, 'llm_done', status='failed', error=str(e))
             writer.log(f"ERROR: LLM extraction failed: {e}")
+            if writer.partial_markdown_path.exists():
+                writer.log(f"Streamed Markdown received before the failure is in {writer.partial_markdown_path.name}")
             writer.log("Continuing with partial data...")
-            llm_data = {
-                'llm_markdown': text,
-                'title': filename,
-                'country': None,
-                'region': None,
-                'partner_name': None
-            }
+            llm_data = fallback_llm_data(text, filename)
             processing_ms = 0
         
         coverage_score = None
         coverage_detail = None
+        coverage_usage = None
+        coverage_method = None
+        coverage_pages = None
+        coverage_failed = False
         
-        if not args.no_coverage and config.get('check_coverage', True):
-            writer.log("Running coverage check...")
-            try:
-                coverage_result = check_coverage(
-                    structure=structure,
-                    content=llm_data.get('llm_markdown', ''),
-                    api_key=api_key,
-                    model=config['claude_model'],
-                    max_tokens=config['claude_max_tokens'],
-                    retry_attempts=config['retry_attempts']
-                )
-                coverage_score = coverage_result.get('score')
-                coverage_detail = coverage_result.get('text')
-                writer.log(f"Coverage check complete: score={coverage_score}/100")
-                if coverage_detail:
-                    writer.log(f"Coverage detail: {coverage_detail}")
-            except CoverageCheckError as e:
-                writer.log(f"WARNING: Coverage check failed: {e}")
+        coverage_stage = None
+        if llm_stage is not None and resumable('coverage_done'):
+            coverage_stage = writer.read_stage('coverage_done')
+        
+        if coverage_stage is not None:
+            coverage_score = coverage_stage['score']
+            coverage_detail = coverage_stage['detail']
+            coverage_method = coverage_stage['method']
+            coverage_pages = coverage_stage['pages']
+            coverage_usage = coverage_stage['usage']
+            writer.log(f"Resumed coverage check from previous run: score={coverage_score}/100")
+        elif (run_coverage and config.get('check_coverage', True)
+              and duplicate_data is not None and duplicate_data.get('coverage_method')):
+            coverage_score = duplicate_data.get('coverage_score')
+            coverage_detail = duplicate_data.get('coverage_detail')
+            coverage_method = duplicate_data['coverage_method']
+            coverage_pages = duplicate_data.get('coverage_pages')
+            writer.log(f"Reused coverage check from {duplicate['filename']}: score={coverage_score}/100")
+        elif run_coverage and config.get('check_coverage', True) and route != 'ocr':
+            coverage_mode = config.get('coverage_mode', 'hybrid')
+            run_llm_coverage = coverage_mode == 'llm'
+            
+            if coverage_mode in ('local', 'hybrid'):
+                writer.log("Running local coverage check...")
+                with metrics.stage('local_coverage'):
+                    local_result = score_coverage(
+                        pages=structure.get('pages', structure.get('sections', [text])),
+                        content=llm_data.get('llm_markdown') or '',
+                        page_threshold=config.get('local_coverage_page_threshold', 0.8)
+                    )
+                coverage_method = 'local'
+                coverage_score = local_result['score']
+                coverage_detail = local_result['text']
+                coverage_pages = local_result['pages']
+                writer.log(f"Local coverage check complete: score={coverage_score}/100")
+                if local_result['dropped_pages']:
+                    writer.log(f"WARNING: Low coverage on pages/sections: {local_result['dropped_pages']}")
+                
+                threshold = config.get('local_coverage_threshold', 90)
+                if coverage_mode == 'hybrid' and (coverage_score is None or coverage_score < threshold):
+                    writer.log(f"Local coverage below {threshold}, running Claude coverage check")
+                    run_llm_coverage = True
+            
+            if run_llm_coverage:
+                writer.log("Running coverage check...")
+                try:
+                    coverage_key = None
+                    coverage_result = None
+                    if cache:
+                        coverage_key = coverage_cache_key(config, digest, llm_data.get('llm_markdown', ''))
+                        coverage_result = cache.get_llm(coverage_key)
+                        if coverage_result is not None:
+                            cache_hits += 1
+                            writer.log("Loaded coverage check from cache")
+                        else:
+                            cache_misses += 1
+                    
+                    if coverage_result is None and 'coverage' in llm_results:
+                        if isinstance(llm_results['coverage'], Exception):
+                            raise CoverageCheckError(str(llm_results['coverage']))
+                        coverage_result, coverage_usage = llm_results['coverage']
+                        metrics.add('llm_coverage', coverage_usage)
+                        if cache:
+                            cache.put_llm(coverage_key, coverage_result)
+                    
+                    if coverage_result is None:
+                        with metrics.stage('llm_coverage'):
+                            coverage_result, coverage_usage = check_coverage(
+                                text=text,
+                                content=llm_data.get('llm_markdown', ''),
+                                api_key=api_key,
+                                model=config['claude_model'],
+                                max_tokens=config['claude_max_tokens'],
+                                retry_attempts=config['retry_attempts'],
+                                cache_document=cache_document
+                            )
+                        metrics.add('llm_coverage', coverage_usage)
+                        if cache:
+                            cache.put_llm(coverage_key, coverage_result)
+                    coverage_method = 'llm'
+                    coverage_score = coverage_result.get('score')
+                    coverage_detail = coverage_result.get('text')
+                    writer.log(f"Coverage check complete: score={coverage_score}/100")
+                    if coverage_detail:
+                        writer.log(f"Coverage detail: {coverage_detail}")
+                except CoverageCheckError as e:
+                    coverage_failed = True
+                    if journal:
+                        journal.record(input_file, digest, 'coverage_done', status='failed', error=str(e))
+                    writer.log(f"WARNING: Coverage check failed: {e}")
+            
+            if journal and not coverage_failed:
+                writer.write_stage('coverage_done', {
+                    'score': coverage_score,
+                    'detail': coverage_detail,
+                    'method': coverage_method,
+                    'pages': coverage_pages,
+                    'usage': coverage_usage
+                })
+                journal.record(input_file, digest, 'coverage_done')
         
         document_data = {
             'filename': filename,
@@ -159,7 +642,10 @@ def main():
             'size_bytes': file_profile['size'],
             'page_count': page_count,
             'token_count': token_count,
+            'token_count_source': token_source,
+            'token_budget': token_budget,
             'needs_ocr': needs_ocr,
+            'ocr_pages': structure.get('ocr_pages', []),
             'title': llm_data.get('title'),
             'country': llm_data.get('country'),
             'region': llm_data.get('region'),
@@ -168,33 +654,168 @@ def main():
             'processing_timestamp': datetime.now().isoformat(),
             'llm_processing_ms': processing_ms,
             'coverage_score': coverage_score,
-            'coverage_detail': coverage_detail
+            'coverage_detail': coverage_detail,
+            'coverage_method': coverage_method,
+            'coverage_pages': coverage_pages,
+            'routing': routing,
+            'duplicate_of': duplicate_of,
+            'llm_stream': llm_stream,
+            'llm_usage': {
+                'extraction': extraction_usage,
+                'coverage': coverage_usage
+            }
         }
         
-        if args.include_year:
+        if include_year:
             document_data['year'] = llm_data.get('year')
         
-        chunks = []
-        pages = structure.get('pages', structure.get('sections', []))
-        for idx, page_text in enumerate(pages, 1):
-            chunks.append({
-                'chunk_id': idx,
-                'text': page_text,
-                'source': {'page': idx}
-            })
+        page_windows = {}
+        if llm_data.get('llm_windows'):
+            document_data['llm_windows'] = [
+                {'window_id': window['window_id'], 'pages': window['pages']}
+                for window in llm_data['llm_windows']
+            ]
+            for window in llm_data['llm_windows']:
+                for page in range(window['pages'][0], window['pages'][1] + 1):
+                    page_windows[page] = window['window_id']
+        
+        def iter_chunks():
+            if config.get('chunking_mode', 'token') == 'page':
+                pages = structure.get('pages', structure.get('sections', []))
+                for idx, page_text in enumerate(pages, 1):
+                    source = {'page': idx}
+                    if idx in page_windows:
+                        source['llm_window'] = page_windows[idx]
+                    yield {
+                        'chunk_id': idx,
+                        'text': page_text,
+                        'source': source
+                    }
+                return
+            
+            with metrics.stage('chunking'):
+                chunks = chunk_document(
+                    units=processor.prepare_for_processing(text, structure)['rag_chunks'],
+                    markdown=llm_data.get('llm_markdown'),
+                    max_tokens=config.get('chunk_max_tokens', 400),
+                    overlap_tokens=config.get('chunk_overlap_tokens', 50),
+                    count_tokens=processor.calculate_token_count
+                )
+            for chunk in chunks:
+                if chunk['source']['page'] in page_windows:
+                    chunk['source']['llm_window'] = page_windows[chunk['source']['page']]
+                yield chunk
+        
+        for stage, usage in document_data['llm_usage'].items():
+            if usage:
+                writer.log(f"Prompt cache ({stage}): {usage['cache_read_input_tokens']} tokens read, "
+                           f"{usage['cache_creation_input_tokens']} tokens written")
+        
+        if cache:
+            writer.log(f"Cache: {cache_hits} hits, {cache_misses} misses")
         
         writer.log(f"Writing outputs to: {writer.doc_dir}")
-        writer.write_document(document_data)
-        writer.write_chunks(chunks)
+        written_chunks = []
+        
+        def recorded_chunks():
+            for chunk in iter_chunks():
+                written_chunks.append(chunk)
+                yield chunk
+        
+        with metrics.stage('write'):
+            writer.write_document(document_data)
+            writer.write_chunks(recorded_chunks() if corpus or search_index else iter_chunks())
+            if corpus:
+                corpus.add(document_data, written_chunks)
+            if units and llm_data.get('llm_windows') and not llm_failed:
+                writer.write_pages(page_state(config, include_year, units, llm_data))
+        if search_index:
+            with metrics.stage('search_index'):
+                search_index.add_document(document_data, written_chunks)
+        if dedup and signature:
+            if llm_failed or route == 'ocr':
+                dedup.remove(writer.doc_id)
+            else:
+                dedup.add(writer.doc_id, filename, file_profile['type'], duplicate_key(config, include_year),
+                          signature, hashes)
+        
+        metrics_data = metrics.to_dict()
+        writer.write_metrics(metrics_data)
+        writer.log(f"Wrote metrics.json ({metrics_data['total_wall_ms']:.0f}ms total)")
+        
+        if journal:
+            partial = llm_failed or coverage_failed
+            journal.record(input_file, digest, 'written', status='partial' if partial else 'done')
+            if not partial:
+                writer.clear_stages()
+        
         writer.finalize("SUCCESS")
         
-        print(f"\nSuccess! Output written to: {writer.doc_dir}")
+        return document_data
         
     except Exception as e:
+        if journal and digest:
+            journal.record(input_file, digest, 'written', status='failed', error=str(e))
         writer.log(f"ERROR: {str(e)}")
         writer.finalize("FAILED")
+        raise
+
+def main():
+    parser = argparse.ArgumentParser(description='Extract text and metadata from documents')
+    parser.add_argument('input_file', help='Input file path (PDF, DOCX, or TXT)')
+    parser.add_argument('output_dir', help='Output directory path')
+    parser.add_argument('--config', default='config.json', help='Config file path')
+    parser.add_argument('--no-coverage', action='store_true', help='Skip coverage check')
+    parser.add_argument('--include-year', action='store_true', help='Extract year from document')
+    parser.add_argument('--no-cache', action='store_true', help='Bypass the extraction cache')
+    
+    args = parser.parse_args()
+    
+    if not os.path.exists(args.input_file):
+        print(f"Error: Input file not found: {args.input_file}")
+        sys.exit(1)
+    
+    if not os.path.exists(args.config):
+        print(f"Error: Config file not found: {args.config}")
+        print("Run: cp config.json.example config.json")
+        sys.exit(1)
+    
+    load_env_file()
+    
+    try:
+        config = load_config(args.config)
+        api_key = get_api_key(config)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    
+    configure_client(config)
+    search_index = index_from_config(config, args.output_dir)
+    dedup = dedup_from_config(config, args.output_dir)
+    
+    try:
+        process_document(
+            input_file=args.input_file,
+            output_dir=args.output_dir,
+            config=config,
+            api_key=api_key,
+            include_year=args.include_year,
+            run_coverage=not args.no_coverage,
+            cache=None if args.no_cache else cache_from_config(config),
+            search_index=search_index,
+            dedup=dedup
+        )
+    except Exception as e:
         print(f"\nError: {e}")
         sys.exit(1)
+    finally:
+        if search_index:
+            search_index.close()
+        if dedup:
+            dedup.close()
+    
+    doc_dir = Path(args.output_dir) / document_id(args.input_file)
+    print(f"\nSuccess! Output written to: {doc_dir}")
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,175 @@
+import re
+from typing import Dict, Any, List, Callable, Iterator, Optional, Set, Tuple
+from .utils import approximate_token_count
+
+WORD_PATTERN = re.compile(r'\w+')
+TABLE_SEPARATOR = re.compile(r'^\|?\s*:?-{3,}')
+
+def _normalize(line: str) -> str:
+    return ' '.join(WORD_PATTERN.findall(line.lower()))
+
+def markdown_boundaries(markdown: Optional[str]) -> Tuple[Set[str], Set[str]]:
+    headings = set()
+    table_rows = set()
+    for line in (markdown or '').splitlines():
+        stripped = line.strip()
+        if stripped.startswith('#') or (len(stripped) > 4 and stripped.startswith('**') and stripped.endswith('**')):
+            words = _normalize(stripped).split()
+            if len(''.join(words)) > 2:
+                headings.add(' '.join(words))
+                for length in range(3, len(words)):
+                    headings.add(' '.join(words[:length]))
+        elif stripped.startswith('|') and not TABLE_SEPARATOR.match(stripped):
+            row = _normalize(stripped)
+            if row:
+                table_rows.add(row)
+    return headings, table_rows
+
+class _Line:
+    __slots__ = ('text', 'unit', 'start', 'end', 'tokens', 'kind')
+
+    def __init__(self, text: str, unit: int, start: int, end: int, tokens: int, kind: str):
+        self.text = text
+        self.unit = unit
+        self.start = start
+        self.end = end
+        self.tokens = tokens
+        self.kind = kind
+
+def _split_long_line(line: _Line, max_tokens: int, count_tokens: Callable[[str], int]) -> Iterator[_Line]:
+    piece_start = None
+    piece_end = None
+    piece_tokens = 0
+    for match in re.finditer(r'\S+', line.text):
+        word_tokens = count_tokens(match.group(0))
+        if piece_start is not None and piece_tokens + word_tokens > max_tokens:
+            yield _Line(line.text[piece_start:piece_end], line.unit, line.start + piece_start,
+                        line.start + piece_end, piece_tokens, line.kind)
+            piece_start = None
+            piece_tokens = 0
+        if piece_start is None:
+            piece_start = match.start()
+        piece_end = match.end()
+        piece_tokens += word_tokens
+    if piece_start is not None:
+        yield _Line(line.text[piece_start:piece_end], line.unit, line.start + piece_start,
+                    line.start + piece_end, piece_tokens, line.kind)
+
+def _iter_blocks(
+    units: List[str],
+    headings: Set[str],
+    table_rows: Set[str],
+    count_tokens: Callable[[str], int]
+) -> Iterator[List[_Line]]:
+    offset = 0
+    table_block: List[_Line] = []
+    for unit_number, unit_text in enumerate(units, 1):
+        line_start = offset
+        for raw_line in unit_text.split('\n'):
+            line_end = line_start + len(raw_line)
+            if raw_line.strip():
+                normalized = _normalize(raw_line)
+                stripped = raw_line.strip()
+                if normalized in headings:
+                    kind = 'heading'
+                elif normalized in table_rows or ('|' in stripped and TABLE_SEPARATOR.match(stripped)):
+                    kind = 'table'
+                else:
+                    kind = 'text'
+                line = _Line(raw_line, unit_number, line_start, line_end, count_tokens(raw_line), kind)
+                if kind == 'table':
+                    table_block.append(line)
+                else:
+                    if table_block:
+                        yield table_block
+                        table_block = []
+                    yield [line]
+            line_start = line_end + 1
+        offset += len(unit_text) + 1
+    if table_block:
+        yield table_block
+
+def chunk_document(
+    units: List[str],
+    markdown: Optional[str] = None,
+    max_tokens: int = 400,
+    overlap_tokens: int = 50,
+    count_tokens: Callable[[str], int] = approximate_token_count
+) -> List[Dict[str, Any]]:
+    headings, table_rows = markdown_boundaries(markdown)
+    min_section_tokens = max_tokens // 4
+    overlap_tokens = min(overlap_tokens, max_tokens // 2)
+
+    chunks: List[Dict[str, Any]] = []
+    current: List[_Line] = []
+    current_tokens = 0
+    has_new_lines = False
+    current_heading = None
+    chunk_heading = None
+
+    def flush(keep_overlap: bool):
+        nonlocal current, current_tokens, has_new_lines, chunk_heading
+        if not has_new_lines or not any(line.tokens for line in current):
+            current = []
+            current_tokens = 0
+            has_new_lines = False
+            return
+        first, last = current[0], current[-1]
+        chunks.append({
+            'chunk_id': len(chunks) + 1,
+            'text': '\n'.join(line.text for line in current),
+            'token_count': current_tokens,
+            'heading': chunk_heading,
+            'contains_table': any(line.kind == 'table' for line in current),
+            'source': {
+                'page': first.unit,
+                'page_end': last.unit,
+                'char_start': first.start,
+                'char_end': last.end
+            }
+        })
+
+        tail: List[_Line] = []
+        tail_tokens = 0
+        if keep_overlap:
+            for line in reversed(current):
+                if tail_tokens + line.tokens > overlap_tokens:
+                    break
+                tail.append(line)
+                tail_tokens += line.tokens
+            tail.reverse()
+        current = tail
+        current_tokens = tail_tokens
+        has_new_lines = False
+        chunk_heading = current_heading
+
+    for block in _iter_blocks(units, headings, table_rows, count_tokens):
+        if block[0].kind == 'heading':
+            if current_tokens >= min_section_tokens:
+                flush(keep_overlap=False)
+            current_heading = block[0].text.strip()
+            if not current:
+                chunk_heading = current_heading
+
+        block_tokens = sum(line.tokens for line in block)
+        if block_tokens > max_tokens:
+            lines = []
+            for line in block:
+                lines.extend(_split_long_line(line, max_tokens, count_tokens) if line.tokens > max_tokens else [line])
+            blocks = [[line] for line in lines]
+        else:
+            blocks = [block]
+
+        for piece in blocks:
+            piece_tokens = sum(line.tokens for line in piece)
+            if current and current_tokens + piece_tokens > max_tokens:
+                flush(keep_overlap=True)
+                if current_tokens + piece_tokens > max_tokens:
+                    current = []
+                    current_tokens = 0
+            current.extend(piece)
+            current_tokens += piece_tokens
+            has_new_lines = True
+
+    flush(keep_overlap=False)
+    return chunks
@@ -1,27 +1,143 @@
-from typing import Tuple, Dict, Any
+from typing import Tuple, Dict, Any, Iterator, List
 import os
+import re
+import zipfile
+import xml.etree.ElementTree as ET
 from .base import BaseDocumentProcessor
-from .utils import simple_token_count, normalize_structure
+from .utils import approximate_token_count, normalize_structure
 
-try:
-    import docx
-except ImportError:
-    docx = None
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+BODY, P, TBL, TR, TC = f'{W}body', f'{W}p', f'{W}tbl', f'{W}tr', f'{W}tc'
+HEADING_NAME = re.compile(r'^heading\s*(\d)$', re.IGNORECASE)
+BODY_TEXT_LEVEL = 9
+
+def _heading_levels(archive: zipfile.ZipFile) -> Dict[str, int]:
+    try:
+        root = ET.fromstring(archive.read('word/styles.xml'))
+    except KeyError:
+        return {}
+    levels = {}
+    for style in root.iter(f'{W}style'):
+        name = style.find(f'{W}name')
+        name = name.get(f'{W}val', '') if name is not None else ''
+        outline = style.find(f'{W}pPr/{W}outlineLvl')
+        match = HEADING_NAME.match(name)
+        if name.lower() == 'title':
+            level = 1
+        elif match:
+            level = int(match.group(1))
+        elif outline is not None and int(outline.get(f'{W}val', BODY_TEXT_LEVEL)) < BODY_TEXT_LEVEL:
+            level = int(outline.get(f'{W}val')) + 1
+        else:
+            continue
+        levels[style.get(f'{W}styleId')] = max(1, min(level, 6))
+    return levels
+
+def _paragraph_text(paragraph: ET.Element) -> str:
+    parts = []
+    for node in paragraph.iter():
+        if node.tag == f'{W}t':
+            parts.append(node.text or '')
+        elif node.tag == f'{W}tab':
+            parts.append('\t')
+        elif node.tag in (f'{W}br', f'{W}cr'):
+            parts.append('\n')
+    return ''.join(parts).strip()
+
+def _paragraph_markdown(paragraph: ET.Element, heading_levels: Dict[str, int]) -> Tuple[str, int]:
+    text = _paragraph_text(paragraph)
+    if not text:
+        return '', 0
+    properties = paragraph.find(f'{W}pPr')
+    level = 0
+    if properties is not None:
+        style = properties.find(f'{W}pStyle')
+        outline = properties.find(f'{W}outlineLvl')
+        if style is not None:
+            level = heading_levels.get(style.get(f'{W}val'), 0)
+        if not level and outline is not None and int(outline.get(f'{W}val', BODY_TEXT_LEVEL)) < BODY_TEXT_LEVEL:
+            level = int(outline.get(f'{W}val')) + 1
+        if level:
+            return f"{'#' * min(level, 6)} {' '.join(text.split())}", level
+        if properties.find(f'{W}numPr') is not None:
+            return f"- {text}", 0
+    return text, 0
+
+def _cell_text(paragraphs: List[str]) -> str:
+    return ' '.join(' '.join(text.split()) for text in paragraphs if text).replace('|', '\\|')
+
+def _table_markdown(rows: List[List[List[str]]]) -> str:
+    rows = [[_cell_text(cell) for cell in row] for row in rows if row]
+    if not rows:
+        return ''
+    width = max(len(row) for row in rows)
+    rows = [row + [''] * (width - len(row)) for row in rows]
+    lines = ['| ' + ' | '.join(rows[0]) + ' |', '|' + ' --- |' * width]
+    lines.extend('| ' + ' | '.join(row) + ' |' for row in rows[1:])
+    return '\n'.join(lines)
+
+def iter_blocks(file_path: str) -> Iterator[Tuple[str, str, int]]:
+    with zipfile.ZipFile(file_path) as archive:
+        heading_levels = _heading_levels(archive)
+        with archive.open('word/document.xml') as f:
+            body = None
+            tables = []
+            for event, elem in ET.iterparse(f, events=('start', 'end')):
+                if event == 'start':
+                    if elem.tag == BODY:
+                        body = elem
+                    elif elem.tag == TBL:
+                        tables.append([])
+                    elif elem.tag == TR and tables:
+                        tables[-1].append([])
+                    elif elem.tag == TC and tables and tables[-1]:
+                        tables[-1][-1].append([])
+                    continue
+
+                if elem.tag == P:
+                    if tables:
+                        if tables[-1] and tables[-1][-1]:
+                            tables[-1][-1][-1].append(_paragraph_text(elem))
+                        elem.clear()
+                        continue
+                    markdown, level = _paragraph_markdown(elem, heading_levels)
+                    if markdown:
+                        yield ('heading' if level else 'paragraph'), markdown, level
+                elif elem.tag == TBL:
+                    rows = tables.pop()
+                    if tables:
+                        if tables[-1] and tables[-1][-1]:
+                            tables[-1][-1][-1].extend(text for row in rows for cell in row for text in cell)
+                        elem.clear()
+                        continue
+                    markdown = _table_markdown(rows)
+                    if markdown:
+                        yield 'table', markdown, 0
+                else:
+                    continue
+                if body is not None:
+                    body.clear()
 
 class DOCXDocumentProcessor(BaseDocumentProcessor):
     def extract_text(self, file_path: str) -> Tuple[str, Dict[str, Any], Dict[str, Any], bool]:
-        text = ""
-        structure = {"sections": []}
-        
-        if docx:
-            doc = docx.Document(file_path)
-            for para in doc.paragraphs:
-                structure["sections"].append(para.text)
-                text += para.text + "\n"
-        else:
-            text = "[python-docx not installed]"
-            structure["sections"].append(text)
-        
+        structure = {"sections": [], "section_tables": []}
+        blocks = []
+        tables = 0
+
+        for kind, markdown, _ in iter_blocks(file_path):
+            if kind == 'heading' and blocks:
+                structure["sections"].append('\n\n'.join(blocks))
+                structure["section_tables"].append(tables)
+                blocks = []
+                tables = 0
+            blocks.append(markdown)
+            tables += kind == 'table'
+        if blocks:
+            structure["sections"].append('\n\n'.join(blocks))
+            structure["section_tables"].append(tables)
+
+        text = "".join(f"{section}\n" for section in structure["sections"])
+
         file_stats = os.stat(file_path)
         file_profile = {
             'size': file_stats.st_size,
@@ -31,7 +147,7 @@ class DOCXDocumentProcessor(BaseDocumentProcessor):
         return text, normalize_structure(structure), file_profile, False
 
     def calculate_token_count(self, text: str) -> int:
-        return simple_token_count(text)
+        return approximate_token_count(text)
 
     def prepare_for_processing(self, text: str, structure: Dict[str, Any]) -> Dict[str, Any]:
         return {
@@ -0,0 +1,120 @@
+import hashlib
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+
+from ..cache import ExtractionCache, make_key
+
+OCR_VERSION = 1
+
+def ocr_available() -> bool:
+    try:
+        import pypdfium2
+        import pytesseract
+    except ImportError:
+        return False
+    return shutil.which(pytesseract.pytesseract.tesseract_cmd) is not None
+
+def pdf_page_count(file_path: str) -> int:
+    try:
+        import pypdfium2
+    except ImportError:
+        return 0
+    pdf = pypdfium2.PdfDocument(file_path)
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+def _ocr_page(pdf, index: int, dpi: int, languages: str, cache: Optional[ExtractionCache]) -> Dict[str, Any]:
+    import pytesseract
+
+    start_time = time.perf_counter()
+    page = pdf[index]
+    try:
+        image = page.render(scale=dpi / 72, grayscale=True).to_pil()
+    finally:
+        page.close()
+    page_hash = hashlib.sha256(image.tobytes()).hexdigest()
+    key = make_key(page_hash, image.size, languages, OCR_VERSION)
+
+    cached = cache.get_ocr(key) if cache else None
+    if cached is not None:
+        text = cached['text']
+    else:
+        text = pytesseract.image_to_string(image, lang=languages)
+        if cache:
+            cache.put_ocr(key, {'text': text})
+    return {
+        'page': index + 1,
+        'text': text.strip(),
+        'page_hash': page_hash,
+        'cached': cached is not None,
+        'ms': round((time.perf_counter() - start_time) * 1000, 2)
+    }
+
+def _ocr_page_range(
+    file_path: str,
+    indices: List[int],
+    dpi: int,
+    languages: str,
+    cache: Optional[ExtractionCache],
+    single_thread: bool = False
+) -> List[Dict[str, Any]]:
+    import pypdfium2
+
+    if single_thread:
+        os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+    pdf = pypdfium2.PdfDocument(file_path)
+    try:
+        return [_ocr_page(pdf, index, dpi, languages, cache) for index in indices]
+    finally:
+        pdf.close()
+
+class PageOCR:
+    def __init__(
+        self,
+        workers: int = 1,
+        dpi: int = 300,
+        languages: str = 'eng',
+        cache: Optional[ExtractionCache] = None
+    ):
+        self.workers = workers
+        self.dpi = dpi
+        self.languages = languages
+        self.cache = cache
+
+    def ocr_pages(self, file_path: str, indices: List[int]) -> List[Dict[str, Any]]:
+        if self.workers <= 1 or len(indices) < 2:
+            return _ocr_page_range(file_path, indices, self.dpi, self.languages, self.cache)
+
+        shard_count = min(len(indices), self.workers * 2)
+        shards = [indices[start::shard_count] for start in range(shard_count)]
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            futures = [pool.submit(_ocr_page_range, file_path, shard, self.dpi, self.languages, self.cache, True)
+                       for shard in shards]
+            results = [result for future in futures for result in future.result()]
+        return sorted(results, key=lambda result: result['page'])
+
+def merge_ocr(
+    extracted: Tuple[str, Dict[str, Any], Dict[str, Any], bool],
+    page_count: int,
+    results: List[Dict[str, Any]]
+) -> Tuple[str, Dict[str, Any], Dict[str, Any], bool]:
+    _, structure, file_profile, _ = extracted
+    pages = list(structure.get('pages', []))
+    pages += [''] * (page_count - len(pages))
+    replaced = []
+    for result in results:
+        if len(result['text']) > len(pages[result['page'] - 1].strip()):
+            pages[result['page'] - 1] = result['text']
+            replaced.append(result['page'])
+
+    structure = dict(structure, pages=pages, ocr_pages=replaced)
+    for field in ('page_timings_ms', 'page_tables'):
+        if field in structure:
+            structure[field] = structure[field] + [0] * (page_count - len(structure[field]))
+    text = "".join(f"{page_text}\n" for page_text in pages)
+    return text, structure, file_profile, not text.strip()
@@ -0,0 +1,46 @@
+import importlib
+from pathlib import Path
+from typing import Dict, Any, Callable, Optional, Tuple, Type
+
+from .base import BaseDocumentProcessor
+
+def _pdf_options(config: dict) -> Dict[str, Any]:
+    return {
+        'parallel_workers': config.get('pdf_page_workers', 1),
+        'parallel_min_pages': config.get('pdf_parallel_min_pages', 40),
+        'detect_tables': config.get('pdf_detect_tables', True)
+    }
+
+PROCESSORS: Dict[str, Tuple[str, str, Optional[Callable[[dict], Dict[str, Any]]]]] = {
+    '.pdf': ('pdf', 'PDFDocumentProcessor', _pdf_options),
+    '.docx': ('docx', 'DOCXDocumentProcessor', None),
+    '.txt': ('text', 'TextDocumentProcessor', None),
+}
+
+def register_processor(
+    extension: str,
+    module: str,
+    class_name: str,
+    options: Optional[Callable[[dict], Dict[str, Any]]] = None
+):
+    PROCESSORS[extension.lower()] = (module, class_name, options)
+
+def supported_extensions() -> Tuple[str, ...]:
+    return tuple(PROCESSORS)
+
+def processor_class(extension: str) -> Type[BaseDocumentProcessor]:
+    if extension not in PROCESSORS:
+        raise ValueError(f"Unsupported file type: {extension}")
+    module, class_name, _ = PROCESSORS[extension]
+    package = __name__.rsplit('.', 1)[0]
+    return getattr(importlib.import_module(f"{package}.{module}"), class_name)
+
+def get_processor(file_path: str, config: Optional[dict] = None) -> BaseDocumentProcessor:
+    extension = Path(file_path).suffix.lower()
+    cls = processor_class(extension)
+    options = PROCESSORS[extension][2]
+    return cls(**options(config or {})) if options else cls()
+
+def preload():
+    for extension in PROCESSORS:
+        processor_class(extension)
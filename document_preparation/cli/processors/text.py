@@ -1,7 +1,7 @@
 from typing import Tuple, Dict, Any
 import os
 from .base import BaseDocumentProcessor
-from .utils import simple_token_count, normalize_structure
+from .utils import approximate_token_count, normalize_structure
 
 class TextDocumentProcessor(BaseDocumentProcessor):
     def extract_text(self, file_path: str) -> Tuple[str, Dict[str, Any], Dict[str, Any], bool]:
@@ -19,7 +19,7 @@ class TextDocumentProcessor(BaseDocumentProcessor):
         return text, normalize_structure(structure), file_profile, False
 
     def calculate_token_count(self, text: str) -> int:
-        return simple_token_count(text)
+        return approximate_token_count(text)
 
     def prepare_for_processing(self, text: str, structure: Dict[str, Any]) -> Dict[str, Any]:
         return {
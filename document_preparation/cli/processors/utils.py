@@ -1,8 +1,19 @@
 import re
 from typing import Dict, Any
 
-def simple_token_count(text: str) -> int:
-    return len(re.findall(r'\w+', text))
+TOKEN_PIECE = re.compile(r'[^\W\d_]+|\d+|[^\w\s]+|_+')
+
+def approximate_token_count(text: str) -> int:
+    count = 0
+    for piece in TOKEN_PIECE.findall(text):
+        if piece[0].isdigit():
+            count += -(-len(piece) // 3)
+        elif piece[0].isalpha():
+            non_ascii = 0 if piece.isascii() else sum(1 for char in piece if ord(char) > 127)
+            count += -(-(len(piece) - non_ascii) // 5) + non_ascii
+        else:
+            count += -(-len(piece) // 2)
+    return count
 
 def normalize_structure(structure: Dict[str, Any]) -> Dict[str, Any]:
     return structure
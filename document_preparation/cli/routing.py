@@ -0,0 +1,95 @@
+from typing import Dict, Any, List
+
+from .processors.utils import approximate_token_count
+
+ROUTES = ('local', 'llm', 'ocr')
+DOCX_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+METADATA_OUTPUT_TOKENS = 150
+PROMPT_OVERHEAD_TOKENS = 400
+
+def _units(text: str, structure: Dict[str, Any]) -> List[str]:
+    return structure.get('pages', structure.get('sections', [text]))
+
+def local_markdown(text: str, structure: Dict[str, Any]) -> str:
+    if structure.get('sections'):
+        return '\n\n'.join(structure['sections']).strip()
+    if 'pages' not in structure:
+        return text.strip()
+    pages = ('\n'.join(line.rstrip() for line in page.splitlines()).strip() for page in structure['pages'])
+    return '\n\n'.join(page for page in pages if page)
+
+def metadata_source(text: str, structure: Dict[str, Any], max_chars: int = 4000) -> str:
+    if structure.get('pages'):
+        return structure['pages'][0][:max_chars]
+    return text[:max_chars]
+
+def _estimated_cost(input_tokens: int, output_tokens: int, config: dict) -> float:
+    return round(input_tokens * config.get('routing_input_cost_per_mtok', 3.0) / 1e6
+                 + output_tokens * config.get('routing_output_cost_per_mtok', 15.0) / 1e6, 6)
+
+def route_document(
+    config: dict,
+    text: str,
+    structure: Dict[str, Any],
+    file_profile: Dict[str, Any],
+    needs_ocr: bool,
+    token_count: int
+) -> Dict[str, Any]:
+    units = _units(text, structure)
+    chars = [len(unit.strip()) for unit in units]
+    min_chars = config.get('routing_min_chars_per_page', 50)
+    sparse_pages = [number for number, count in enumerate(chars, 1) if count < min_chars]
+    tables = structure.get('page_tables', structure.get('section_tables'))
+    table_count = sum(tables) if tables is not None else None
+
+    signals = {
+        'mime_type': file_profile.get('type'),
+        'units': len(units),
+        'mean_chars_per_unit': round(sum(chars) / len(chars), 1) if chars else 0,
+        'sparse_units': len(sparse_pages),
+        'tables': table_count,
+        'needs_ocr': needs_ocr,
+        'ocr_pages': len(structure.get('ocr_pages', [])),
+        'token_count': token_count
+    }
+
+    mode = config.get('routing_mode', 'auto')
+    is_paged = 'pages' in structure
+    ocr_done = 'ocr_pages' in structure
+    if needs_ocr:
+        route, reason = 'ocr', 'no usable text layer'
+    elif (is_paged and units and not ocr_done
+          and len(sparse_pages) / len(units) > config.get('routing_ocr_page_fraction', 0.5)):
+        route, reason = 'ocr', f"{len(sparse_pages)}/{len(units)} pages below {min_chars} characters"
+    elif mode in ROUTES:
+        route, reason = mode, 'routing_mode'
+    elif structure.get('ocr_pages'):
+        route, reason = 'llm', f"{len(structure['ocr_pages'])} pages read by OCR"
+    elif file_profile.get('type') == 'text/plain':
+        route, reason = 'local', 'plain text input'
+    elif file_profile.get('type') == DOCX_TYPE:
+        route, reason = 'local', 'DOCX converted to Markdown from its XML'
+    elif is_paged and table_count is None:
+        route, reason = 'llm', 'table detection disabled (pdf_detect_tables)'
+    elif table_count:
+        route, reason = 'llm', f"{table_count} tables detected"
+    else:
+        route, reason = 'local', 'clean text layer without tables'
+
+    text_tokens = token_count
+    full_cost = _estimated_cost(text_tokens + PROMPT_OVERHEAD_TOKENS, text_tokens + METADATA_OUTPUT_TOKENS, config)
+    if route == 'llm':
+        route_cost = full_cost
+    elif route == 'local':
+        metadata_tokens = approximate_token_count(metadata_source(text, structure)) + PROMPT_OVERHEAD_TOKENS
+        route_cost = _estimated_cost(metadata_tokens, METADATA_OUTPUT_TOKENS, config)
+    else:
+        route_cost = 0.0
+
+    return {
+        'route': route,
+        'reason': reason,
+        'signals': signals,
+        'estimated_cost_usd': {'full_llm': full_cost, 'route': route_cost},
+        'estimated_savings_usd': round(full_cost - route_cost, 6)
+    }
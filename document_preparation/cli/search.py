@@ -0,0 +1,71 @@
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from cli.output.search_index import FACETS, SearchIndex
+
+def main():
+    parser = argparse.ArgumentParser(description='Search the chunks of prepared documents')
+    parser.add_argument('output_dir', help='Output directory of prepare/batch/watch runs')
+    parser.add_argument('query', nargs='?', help='Search terms, ranked with BM25')
+    parser.add_argument('--match', action='store_true',
+                        help='Pass the query as an FTS5 expression (phrases, AND, NOT, NEAR)')
+    parser.add_argument('--limit', type=int, default=10, help='Maximum number of chunks returned')
+    for field in FACETS:
+        parser.add_argument(f"--{field.replace('_', '-')}", dest=field, help=f"Only documents with this {field}")
+    parser.add_argument('--sync', action='store_true',
+                        help='Index documents written without the index, and drop deleted ones')
+    parser.add_argument('--facets', choices=FACETS, help='List the values of a facet with document counts')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.output_dir):
+        print(f"Error: Output directory not found: {args.output_dir}")
+        sys.exit(1)
+
+    index = SearchIndex(args.output_dir)
+    try:
+        if args.sync:
+            start_time = time.time()
+            result = index.sync(args.output_dir)
+            print(f"Indexed {result['updated']} documents, removed {result['removed']}, "
+                  f"{result['documents']} in total ({time.time() - start_time:.1f}s)")
+
+        if args.facets:
+            for value, count in index.facets(args.facets):
+                print(f"{count:>6}  {value}")
+
+        if not args.query:
+            if not args.sync and not args.facets:
+                stats = index.stats()
+                print(f"{stats['documents']} documents, {stats['chunks']} chunks")
+            return
+
+        start_time = time.perf_counter()
+        results = index.search(args.query, limit=args.limit, match=args.match,
+                               **{field: getattr(args, field) for field in FACETS})
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        index.close()
+
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+        return
+
+    for result in results:
+        pages = result['page'] if result['page'] == result['page_end'] else f"{result['page']}-{result['page_end']}"
+        print(f"{result['score']:>8.3f}  {result['doc_id']}  chunk {result['chunk_id']}  page {pages}")
+        print(f"          {' '.join(result['snippet'].split())}")
+    print(f"\n{len(results)} chunks in {elapsed_ms:.1f}ms")
+
+if __name__ == '__main__':
+    main()
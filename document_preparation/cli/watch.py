@@ -0,0 +1,321 @@
+import argparse
+import os
+import shutil
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+
+from cli.prepare import load_env_file, get_api_key, load_config
+from cli.batch import SUPPORTED_EXTENSIONS, extract_with_metrics, process_with_metrics, restore_corpus_rows
+from cli.cache import ExtractionCache, cache_from_config, file_hash
+from cli.llm.client import configure_client, get_client
+from cli.llm.tokens import counter_from_config
+from cli.output.corpus import CorpusWriter, corpus_from_config
+from cli.output.journal import JobJournal
+from cli.output.search_index import index_from_config
+from cli.output.writer import document_id
+from cli.dedup import dedup_from_config
+from cli.processors.registry import preload
+
+class _WakeOnChange(FileSystemEventHandler):
+    def __init__(self, wake: threading.Event):
+        self.wake = wake
+
+    def on_any_event(self, event):
+        self.wake.set()
+
+class InboxWatcher:
+    def __init__(
+        self,
+        inbox: str,
+        output_dir: str,
+        config: dict,
+        api_key: str,
+        include_year: bool = False,
+        run_coverage: bool = True,
+        cache: Optional[ExtractionCache] = None,
+        poll_seconds: float = 2.0,
+        settle_seconds: float = 1.0,
+        extract_workers: Optional[int] = None,
+        llm_concurrency: Optional[int] = None,
+        done_dir: Optional[str] = None
+    ):
+        self.inbox = inbox
+        self.output_dir = output_dir
+        self.config = config
+        self.api_key = api_key
+        self.include_year = include_year
+        self.run_coverage = run_coverage
+        self.cache = cache
+        self.poll_seconds = poll_seconds
+        self.settle_seconds = settle_seconds
+        self.extract_workers = extract_workers or config.get('extract_workers') or os.cpu_count() or 1
+        self.llm_concurrency = llm_concurrency or config.get('llm_concurrency', 4)
+        self.done_dir = done_dir
+        self.extract_config = dict(config, pdf_page_workers=1)
+        self.detect_tables = config.get('pdf_detect_tables', True)
+
+        self.journal = JobJournal(output_dir)
+        self.token_counter = counter_from_config(config, api_key, cache)
+        self.corpus: Optional[CorpusWriter] = None
+        self.search_index = index_from_config(config, output_dir)
+        self.dedup = dedup_from_config(config, output_dir)
+        self.seen: Dict[str, Tuple[int, float]] = {}
+        self.in_flight: Dict[str, Tuple[int, float]] = {}
+        self.stats = {'succeeded': 0, 'failed': 0, 'skipped': 0}
+        self.wake = threading.Event()
+        self.stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._corpus_parts = 0
+        self._extract_pool = None
+        self._llm_pool = None
+
+    def scan(self) -> Tuple[List[Tuple[str, Tuple[int, float]]], int]:
+        ready = []
+        settling = 0
+        now = time.time()
+        for root, _, files in os.walk(self.inbox):
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                if name.startswith('.') or Path(name).suffix.lower() not in SUPPORTED_EXTENSIONS:
+                    continue
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                signature = (stat.st_size, stat.st_mtime)
+                with self._lock:
+                    if path in self.in_flight or self.seen.get(path) == signature:
+                        continue
+                if now - stat.st_mtime < self.settle_seconds:
+                    settling += 1
+                    continue
+                ready.append((path, signature))
+        return ready, settling
+
+    def _finish(self, path: str, signature: Tuple[int, float], status: str, detail: str):
+        with self._lock:
+            self.in_flight.pop(path, None)
+            self.seen[path] = signature
+            self.stats[status] += 1
+        print(f"[watch] {os.path.basename(path)}: {status.upper()} {detail}")
+        if status == 'succeeded' and self.done_dir:
+            target = Path(self.done_dir) / Path(path).relative_to(self.inbox)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.move(path, target)
+            with self._lock:
+                self.seen.pop(path, None)
+        self.wake.set()
+
+    def _submit_llm(self, path: str, signature: Tuple[int, float], digest: str, extracted, extract_record=None):
+        start_time = time.time()
+        future = self._llm_pool.submit(
+            process_with_metrics,
+            extract_record=extract_record,
+            input_file=path,
+            output_dir=self.output_dir,
+            config=self.config,
+            api_key=self.api_key,
+            include_year=self.include_year,
+            run_coverage=self.run_coverage,
+            extracted=extracted,
+            cache=self.cache,
+            journal=self.journal,
+            corpus=self.corpus,
+            search_index=self.search_index,
+            dedup=self.dedup,
+            token_counter=self.token_counter
+        )
+
+        def done(future: Future):
+            try:
+                document_data, _ = future.result()
+            except Exception as e:
+                self._finish(path, signature, 'failed', f"({e})")
+                return
+            self._finish(path, signature, 'succeeded',
+                         f"({document_data.get('token_count', 0)} tokens, {time.time() - start_time:.1f}s)")
+
+        future.add_done_callback(done)
+
+    def _open_corpus(self) -> Optional[CorpusWriter]:
+        if self.corpus is None:
+            self.corpus = corpus_from_config(self.config, self.output_dir)
+            if self.corpus is not None:
+                self._corpus_parts += 1
+                self.corpus.run_id = f"{self.corpus.run_id}-{self._corpus_parts}"
+        return self.corpus
+
+    def submit(self, path: str, signature: Tuple[int, float]):
+        try:
+            digest = file_hash(path)
+        except OSError as e:
+            print(f"[watch] {os.path.basename(path)}: cannot read ({e})")
+            return
+        if self.journal.is_complete(path, digest):
+            with self._lock:
+                self.seen[path] = signature
+                self.stats['skipped'] += 1
+                corpus = self._open_corpus()
+            if corpus:
+                restore_corpus_rows(corpus, self.output_dir, path)
+            return
+
+        with self._lock:
+            doc_id = document_id(path)
+            if any(document_id(other) == doc_id for other in self.in_flight if other != path):
+                return
+            self.in_flight[path] = signature
+            self._open_corpus()
+        print(f"[watch] Queued {os.path.basename(path)}")
+
+        if self.cache:
+            cached = self.cache.get_extraction(digest, os.path.basename(path), self.detect_tables)
+            if cached is not None:
+                self._submit_llm(path, signature, digest, cached)
+                return
+
+        def extracted(future: Future):
+            try:
+                extracted, extract_record = future.result()
+            except Exception as e:
+                self._finish(path, signature, 'failed', f"(extraction failed: {e})")
+                return
+            if self.cache:
+                self.cache.put_extraction(digest, extracted, self.detect_tables)
+            self._submit_llm(path, signature, digest, extracted, extract_record)
+
+        self._extract_pool.submit(extract_with_metrics, path, self.extract_config).add_done_callback(extracted)
+
+    def _rotate_corpus(self):
+        with self._lock:
+            if self.in_flight or self.corpus is None:
+                return
+            corpus, self.corpus = self.corpus, None
+        corpus.close()
+        if corpus.documents_written:
+            print(f"[watch] Corpus part written: {corpus.summary()['paths']['documents']}")
+
+    def stop(self):
+        self.stopping.set()
+        self.wake.set()
+
+    def run(self, once: bool = False) -> Dict[str, Any]:
+        observer = None
+        if Observer is not None:
+            observer = Observer()
+            observer.schedule(_WakeOnChange(self.wake), self.inbox, recursive=True)
+            observer.start()
+
+        print(f"[watch] Watching {self.inbox} ({'inotify' if observer else f'polling every {self.poll_seconds}s'}), "
+              f"{self.extract_workers} extract workers, {self.llm_concurrency} concurrent documents")
+        self._extract_pool = ProcessPoolExecutor(max_workers=self.extract_workers)
+        self._llm_pool = ThreadPoolExecutor(max_workers=self.llm_concurrency)
+        try:
+            while not self.stopping.is_set():
+                self.wake.clear()
+                ready, settling = self.scan()
+                for path, signature in ready:
+                    self.submit(path, signature)
+                with self._lock:
+                    idle = not self.in_flight
+                if idle:
+                    self._rotate_corpus()
+                    if once and not ready and not settling:
+                        break
+                self.wake.wait(min(self.poll_seconds, self.settle_seconds) if settling else self.poll_seconds)
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()
+            self._extract_pool.shutdown(wait=True)
+            self._llm_pool.shutdown(wait=True)
+            self._rotate_corpus()
+            if self.search_index:
+                self.search_index.close()
+            if self.dedup:
+                self.dedup.close()
+
+        return {
+            **self.stats,
+            'cache': self.cache.stats() if self.cache else None,
+            'token_counting': self.token_counter.stats,
+            'llm_client': get_client(self.api_key).stats
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description='Watch an inbox directory and process new documents as they arrive')
+    parser.add_argument('inbox', help='Directory to watch for PDF, DOCX and TXT files')
+    parser.add_argument('output_dir', help='Output directory path')
+    parser.add_argument('--config', default='config.json', help='Config file path')
+    parser.add_argument('--no-coverage', action='store_true', help='Skip coverage check')
+    parser.add_argument('--include-year', action='store_true', help='Extract year from document')
+    parser.add_argument('--extract-workers', type=int, help='Processes used for local text extraction')
+    parser.add_argument('--llm-concurrency', type=int, help='Documents processed concurrently after extraction')
+    parser.add_argument('--no-cache', action='store_true', help='Bypass the extraction cache')
+    parser.add_argument('--poll-seconds', type=float, help='Interval between inbox scans')
+    parser.add_argument('--settle-seconds', type=float,
+                        help='Time a file must go unmodified before it is picked up')
+    parser.add_argument('--done-dir', help='Move successfully processed files here')
+    parser.add_argument('--once', action='store_true', help='Process the current inbox contents and exit')
+
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.inbox):
+        print(f"Error: Inbox directory not found: {args.inbox}")
+        sys.exit(1)
+
+    if not os.path.exists(args.config):
+        print(f"Error: Config file not found: {args.config}")
+        print("Run: cp config.json.example config.json")
+        sys.exit(1)
+
+    load_env_file()
+
+    try:
+        config = load_config(args.config)
+        api_key = get_api_key(config)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    configure_client(config)
+    preload()
+
+    watcher = InboxWatcher(
+        inbox=args.inbox,
+        output_dir=args.output_dir,
+        config=config,
+        api_key=api_key,
+        include_year=args.include_year,
+        run_coverage=not args.no_coverage,
+        cache=None if args.no_cache else cache_from_config(config),
+        poll_seconds=args.poll_seconds or config.get('watch_poll_seconds', 2.0),
+        settle_seconds=args.settle_seconds if args.settle_seconds is not None else config.get('watch_settle_seconds', 1.0),
+        extract_workers=args.extract_workers,
+        llm_concurrency=args.llm_concurrency,
+        done_dir=args.done_dir
+    )
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda signum, frame: watcher.stop())
+
+    stats = watcher.run(once=args.once)
+
+    print(f"\n[watch] Stopped: {stats['succeeded']} succeeded, {stats['failed']} failed, "
+          f"{stats['skipped']} already processed")
+
+if __name__ == '__main__':
+    main()
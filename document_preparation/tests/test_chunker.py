@@ -0,0 +1,32 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from cli.processors.chunker import chunk_document
+
+TABLE = "\n".join([
+    "| Indicator | Baseline | Target |",
+    "| --- | --- | --- |",
+    *(f"| Women in leadership row {row} | {row * 3}% | {row * 5}% |" for row in range(1, 5))
+])
+
+def test_table_that_fits_budget_stays_in_one_chunk():
+    unit = ("# Results framework\n"
+            + "The programme tracks progress against the indicators agreed with partners during appraisal. " * 3
+            + "\n" + TABLE + "\nClosing remarks follow the table.")
+
+    chunks = chunk_document([unit], markdown=unit, max_tokens=120, overlap_tokens=0)
+
+    table_chunks = [chunk for chunk in chunks if "| Indicator |" in chunk['text'] or "| --- |" in chunk['text']]
+    assert len(table_chunks) == 1
+    assert TABLE in table_chunks[0]['text']
+    assert table_chunks[0]['contains_table']
+
+def test_horizontal_rule_is_not_a_table_row():
+    unit = "Introduction paragraph.\n---\nBody paragraph."
+
+    chunks = chunk_document([unit], max_tokens=120, overlap_tokens=0)
+
+    assert len(chunks) == 1
+    assert not chunks[0]['contains_table']